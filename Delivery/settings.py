@@ -39,14 +39,90 @@ LEAFLET_CONFIG = {
 
 APPEND_SLASH=False 
 
+# Upper bound on location pairs kept in the in-process distance cache
+DISTANCE_CACHE_MAX_ENTRIES = 5_000_000
+
+# Seconds a durable distance pair is kept before solve workers prune it
+DISTANCE_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Orders within this many metres of an existing order location are snapped onto it as one stop (0 = off)
+LOCATION_SNAP_METRES = 15
+
+# Seconds before the in-memory nearest-store index is rebuilt from the database
+STORE_INDEX_TTL = 60
+
+# Solve the route variants concurrently on a shared process pool
+ROUTING_PARALLEL_VARIANTS = True
+ROUTING_POOL_WORKERS = 3
+
+# Above this many orders a delivery is clustered and solved per cluster
+ROUTING_DECOMPOSE_THRESHOLD = 400
+ROUTING_CLUSTER_SIZE = 150
+
+# Keep only each order's k nearest neighbours as successors (None = dense model)
+ROUTING_SPARSE_NEIGHBOURS = None
+
+# Prebuilt road graph (.npz from `manage.py build_road_graph`) per store id, or
+# under "default" for every store; stores without one use haversine distances
+ROUTING_ROAD_NETWORKS = {}
+
+# Directory of memory-mapped distance matrices shared with solver processes
+# (None keeps them in memory), evicted by total size and by age in seconds,
+# but never within the grace seconds after a matrix was last read
+ROUTING_MATRIX_DIR = BASE_DIR / 'matrix_store'
+ROUTING_MATRIX_STORE_MAX_BYTES = 2 * 1024**3
+ROUTING_MATRIX_STORE_MAX_AGE = 24 * 3600
+ROUTING_MATRIX_STORE_GRACE = 15 * 60
+
+# Re-plan changed deliveries from their previous routes, polishing for this many seconds
+ROUTING_WARM_START = True
+ROUTING_WARM_START_TIME_LIMIT = 1
+
+# Search budget per strategy in seconds, grown with the number of orders,
+# and the share of it without improvement after which a search stops
+ROUTING_TIME_PER_ORDER = 0.01
+ROUTING_TIME_LIMIT_MIN = 0.05
+ROUTING_TIME_LIMIT_MAX = 60
+ROUTING_PLATEAU_WINDOW = 0.25
+
+# Database-backed solve queue, drained by `manage.py solve_worker`
+SOLVE_WORKERS = 2
+SOLVE_QUEUE_LIMIT = 20
+SOLVE_RETRY_AFTER = 10
+
+# A running job's worker stamps it every SOLVE_HEARTBEAT_INTERVAL seconds,
+# and a job unstamped for SOLVE_JOB_TIMEOUT seconds is requeued, until it
+# has been claimed SOLVE_MAX_ATTEMPTS times and is failed instead
+SOLVE_HEARTBEAT_INTERVAL = 15
+SOLVE_JOB_TIMEOUT = 120
+SOLVE_MAX_ATTEMPTS = 3
+
+# Seconds the dashboard counts and totals are served from the cache
+DASHBOARD_SUMMARY_TTL = 30
+
+# Seconds of finished solve jobs the /metrics scrape aggregates
+METRICS_SOLVE_WINDOW = 3600
+
+# One JSON line per route solve, with phase timings and solver statistics
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'delivery_app.metrics': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'delivery_app.middleware.QueryCountMiddleware',
 ]
 
 ROOT_URLCONF = 'delivery.urls'
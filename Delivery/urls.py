@@ -15,8 +15,29 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from delivery_app import views
+
+router = DefaultRouter()
+router.register('locations', views.LocationViewSet)
+router.register('orders', views.OrderViewSet)
+router.register('stores', views.StoreViewSet)
+router.register('vehicles', views.VehicleViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include(router.urls)),
+    path('delivery/<int:pk>/plans/', views.delivery_route_plans, name='delivery-plans'),
+    path('delivery/<int:pk>/solve/', views.DeliverySolveAPIView.as_view(), name='delivery-solve'),
+    path('jobs/<int:pk>/', views.SolveJobAPIView.as_view(), name='solve-job'),
+    path('orders/import/', views.import_orders_file, name='import-orders'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('dashboard/summary/', views.dashboard_summary_view, name='dashboard-summary'),
+    path('dashboard/deliveries/', views.DashboardDeliveryList.as_view(), name='dashboard-deliveries'),
+    path('dashboard/orders/', views.DashboardOrderList.as_view(), name='dashboard-orders'),
+    path('dashboard/stores/', views.DashboardStoreList.as_view(), name='dashboard-stores'),
+    path('dashboard/vehicles/', views.DashboardVehicleList.as_view(), name='dashboard-vehicles'),
+    path('dashboard/daily/', views.DailyStatsList.as_view(), name='dashboard-daily'),
+    path('dashboard/dates/', views.available_dates_view, name='dashboard-dates'),
 ]
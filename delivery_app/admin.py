@@ -4,7 +4,10 @@ from delivery_app.models import (
     Order,
     Store,
     Vehicle,
-    Delivery
+    Delivery,
+    RoutePlan,
+    SolveJob,
+    DailyDeliveryStats
 )
 
 class OrderInline(admin.TabularInline):
@@ -59,3 +62,25 @@ class DeliveryAdmin(admin.ModelAdmin):
     ordering = ['-date_of_delivery']
 
 
+@admin.register(RoutePlan)
+class RoutePlanAdmin(admin.ModelAdmin):
+    list_display = ['id', 'delivery', 'position', 'strategy', 'total_distance', 'created_at']
+    list_filter = ['strategy']
+    search_fields = ['delivery__store__name', 'fingerprint']
+    ordering = ['-created_at']
+
+
+@admin.register(SolveJob)
+class SolveJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'delivery', 'status', 'progress', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['delivery__store__name']
+    ordering = ['-created_at']
+
+
+@admin.register(DailyDeliveryStats)
+class DailyDeliveryStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'store', 'order_count', 'total_weight', 'vehicle_count', 'planned_distance', 'plan_status']
+    list_filter = ['plan_status', 'date']
+    search_fields = ['store__name']
+    ordering = ['-date']
@@ -0,0 +1,290 @@
+import math
+import random
+import numpy as np
+import resource
+import tracemalloc
+from datetime import date
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from delivery_app.metrics import PhaseTimer
+from delivery_app.models import Delivery, Location, Order, Store, Vehicle
+from delivery_app.solver import STRATEGIES, build_routing_model, solve_routes
+from delivery_app.store_index import store_index
+from delivery_app.utils import (
+    assign_vehicles_and_extract_routes,
+    expand_routes,
+    routing_data,
+    save_route_assignments,
+    solve_time_budget,
+    strategy_label,
+)
+
+BENCHMARK_CENTRE = (73.8567, 18.5204)
+BENCHMARK_SPEEDS = [25, 30, 40]
+
+
+def synthetic_instance(n_orders, n_vehicles, tightness=0.8, spread_km=10, seed=0):
+    """Build an unsaved store, orders and vehicles for one reproducible benchmark instance.
+
+    Orders are scattered uniformly over a disc of spread_km around the
+    store, and the fleet is sized so the total order weight is tightness
+    times its total capacity.
+    """
+    rng = random.Random(seed)
+    lon0, lat0 = BENCHMARK_CENTRE
+    store = Store(
+        name=f"Benchmark store {seed}",
+        location=Location(address="Benchmark depot", point=Point(lon0, lat0, srid=4326)),
+    )
+
+    orders = []
+    for i in range(n_orders):
+        radius = spread_km * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        lat = lat0 + radius * math.cos(bearing) / 111.32
+        lon = lon0 + radius * math.sin(bearing) / (111.32 * math.cos(math.radians(lat0)))
+        orders.append(
+            Order(
+                order_id=f"BENCH-{seed}-{i}",
+                weight=rng.randint(1, 25),
+                date_of_order=date.today(),
+                delivery_location=Location(
+                    address=f"Benchmark stop {i}", point=Point(lon, lat, srid=4326)
+                ),
+            )
+        )
+
+    total_weight = sum(o.weight for o in orders)
+    capacity = max(25, math.ceil(total_weight / (n_vehicles * tightness)))
+    vehicles = [
+        Vehicle(
+            vehicle_no=f"BENCH-{seed}-V{j}",
+            capacity=capacity,
+            average_speed=rng.choice(BENCHMARK_SPEEDS),
+        )
+        for j in range(n_vehicles)
+    ]
+    return store, orders, vehicles
+
+
+def write_assignments(timer, store, orders, vehicles, parts):
+    """Insert the instance, time save_route_assignments on it, then roll everything back.
+
+    Every write happens inside one transaction that is always rolled
+    back, so the benchmark leaves no rows behind. Saving the store drops
+    the store index, which is dropped again afterwards so no process
+    keeps the rolled-back store cached.
+    """
+    with transaction.atomic():
+        Location.objects.bulk_create(
+            [store.location] + [o.delivery_location for o in orders]
+        )
+        store.save()
+        Vehicle.objects.bulk_create(vehicles)
+        Order.objects.bulk_create(orders)
+        delivery = Delivery.objects.create(
+            store=store,
+            date_of_delivery=date.today(),
+            total_weight=sum(o.weight for o in orders),
+        )
+        with timer.phase("db_write"):
+            save_route_assignments(delivery, parts)
+        transaction.set_rollback(True)
+    store_index.invalidate()
+
+
+def compare_sparse(store, orders, vehicles, neighbours, budget, plateau, dense_costs):
+    """Solve every strategy again on the sparse model and compare it with the dense costs.
+
+    A strategy without a sparse solution is one solve_route_variants would
+    retry on the dense model, so it counts as a dense fallback. gap_pct is
+    how much longer the sparse routes are than the dense ones.
+    """
+    timer = PhaseTimer()
+    with timer.phase("routing_data"):
+        data = routing_data(store, orders, vehicles, neighbours, stored=False)
+    costs, gaps, fallbacks = {}, {}, 0
+    for strategy in STRATEGIES:
+        label = strategy_label(strategy)
+        with timer.phase(f"solve:{label}"):
+            routes, _ = solve_routes(data, strategy, budget, plateau=plateau)
+        if routes is None:
+            costs[label] = None
+            fallbacks += 1
+            continue
+        variant = assign_vehicles_and_extract_routes(
+            data, expand_routes(data, routes), vehicles, orders, store
+        )
+        costs[label] = variant["total_distance"]
+        dense = dense_costs.get(label)
+        if dense:
+            gaps[label] = round((costs[label] - dense) / dense * 100, 2)
+    return {
+        "neighbours": neighbours,
+        "phases": timer.phases,
+        "cost_km": costs,
+        "gap_pct": gaps,
+        "dense_fallbacks": fallbacks,
+    }
+
+
+def run_benchmark(
+    n_orders,
+    n_vehicles,
+    tightness=0.8,
+    spread_km=10,
+    seed=0,
+    time_limit=None,
+    write_db=True,
+    neighbours=None,
+):
+    """Time every phase of the routing pipeline on one synthetic instance.
+
+    Each strategy's solve time includes building its own model; the
+    build_model phase times one extra build on its own. Without a fixed
+    time_limit, strategies get the adaptive budget and plateau stop of a
+    real solve. The matrix is always computed, never read from or written
+    to the matrix store, so repeat runs time the same work. With
+    neighbours set, the run also reports the sparse model against the
+    dense one, timed apart from the dense phases.
+    """
+    store, orders, vehicles = synthetic_instance(n_orders, n_vehicles, tightness, spread_km, seed)
+    orders.sort(key=lambda o: o.weight, reverse=True)
+    vehicles.sort(key=lambda v: (-v.average_speed, -v.capacity))
+
+    timer = PhaseTimer()
+    tracemalloc.start()
+    try:
+        with timer.phase("routing_data"):
+            data = routing_data(store, orders, vehicles, 0, stored=False)
+        with timer.phase("build_model"):
+            build_routing_model(data)
+
+        budget = time_limit or solve_time_budget(n_orders)
+        plateau = None if time_limit else budget * settings.ROUTING_PLATEAU_WINDOW
+        costs, solver, best = {}, {}, None
+        for strategy in STRATEGIES:
+            label = strategy_label(strategy)
+            with timer.phase(f"solve:{label}"):
+                routes, stats = solve_routes(data, strategy, budget, plateau=plateau)
+            routes = expand_routes(data, routes)
+            solver[label] = {
+                key: stats[key] for key in ("time_limit", "search_seconds", "stop_reason")
+            }
+            if routes is None:
+                costs[label] = None
+                continue
+            with timer.phase(f"extract:{label}"):
+                variant = assign_vehicles_and_extract_routes(data, routes, vehicles, orders, store)
+            costs[label] = variant["total_distance"]
+            if best is None or variant["total_distance"] < costs[best[0]]:
+                best = (label, routes)
+
+        sparse = None
+        if neighbours:
+            sparse = compare_sparse(store, orders, vehicles, neighbours, budget, plateau, costs)
+
+        if write_db and best is not None:
+            write_assignments(timer, store, orders, vehicles, [(best[1], vehicles, orders)])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "n_orders": n_orders,
+        "n_vehicles": n_vehicles,
+        "tightness": tightness,
+        "spread_km": spread_km,
+        "seed": seed,
+        "phases": timer.phases,
+        "cost_km": costs,
+        "solver": solver,
+        "best_strategy": best[0] if best else None,
+        "sparse": sparse,
+        "peak_python_mb": peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_key(run):
+    return (run["n_orders"], run["n_vehicles"], run["tightness"], run["spread_km"], run["seed"])
+
+
+def compare_runs(baseline, current):
+    """Pair the runs of two benchmark reports by instance as (baseline, current) values."""
+    previous = {run_key(run): run for run in baseline["runs"]}
+    rows = []
+    for run in current["runs"]:
+        old = previous.get(run_key(run))
+        if old is None:
+            continue
+        rows.append(
+            {
+                "instance": run_key(run),
+                "phases": {
+                    name: (old["phases"].get(name), seconds)
+                    for name, seconds in run["phases"].items()
+                },
+                "cost_km": {
+                    label: (old["cost_km"].get(label), km)
+                    for label, km in run["cost_km"].items()
+                },
+                "peak_python_mb": (old["peak_python_mb"], run["peak_python_mb"]),
+            }
+        )
+    return rows
+
+
+def scaling_series(runs):
+    """Mean seconds and memory per instance size, for each fleet and instance shape.
+
+    Runs are grouped by (n_vehicles, tightness, spread_km) and averaged
+    over seeds per order count. Each series also gets the exponent of a
+    log-log fit of total seconds against order count, so 2.0 means the
+    pipeline scales quadratically over the sizes measured.
+    """
+    groups = {}
+    for run in runs:
+        shape = (run["n_vehicles"], run["tightness"], run["spread_km"])
+        groups.setdefault(shape, {}).setdefault(run["n_orders"], []).append(run)
+
+    series = []
+    for (n_vehicles, tightness, spread_km), sizes in sorted(groups.items()):
+        points = []
+        for n_orders, size_runs in sorted(sizes.items()):
+            points.append(
+                {
+                    "n_orders": n_orders,
+                    "runs": len(size_runs),
+                    "total_seconds": float(
+                        np.mean([sum(r["phases"].values()) for r in size_runs])
+                    ),
+                    "solve_seconds": float(
+                        np.mean(
+                            [
+                                sum(s for name, s in r["phases"].items() if name.startswith("solve:"))
+                                for r in size_runs
+                            ]
+                        )
+                    ),
+                    "peak_python_mb": float(np.mean([r["peak_python_mb"] for r in size_runs])),
+                }
+            )
+        exponent = None
+        if len(points) > 1:
+            exponent = np.polyfit(
+                np.log([p["n_orders"] for p in points]),
+                np.log([max(p["total_seconds"], 1e-9) for p in points]),
+                1,
+            )[0]
+        series.append(
+            {
+                "n_vehicles": n_vehicles,
+                "tightness": tightness,
+                "spread_km": spread_km,
+                "points": points,
+                "exponent": None if exponent is None else round(float(exponent), 3),
+            }
+        )
+    return series
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def sweep_order(depot, coords):
+    """Order indices of coords by bearing from the depot, starting after the widest empty gap.
+
+    Starting after the gap means no dense group of orders is cut at the
+    seam of the sweep.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    dx = (coords[:, 0] - depot[0]) * np.cos(np.radians(depot[1]))
+    dy = coords[:, 1] - depot[1]
+    angles = np.arctan2(dy, dx)
+
+    order = np.argsort(angles)
+    gaps = np.diff(np.concatenate([angles[order], angles[order[:1]] + 2 * np.pi]))
+    return np.roll(order, -(int(gaps.argmax()) + 1))
+
+
+def sweep_partition(depot, coords, weights, capacities):
+    """Split orders into angular sectors around the depot, one per fleet capacity.
+
+    Each sector takes a share of the total weight proportional to its
+    capacity, but the sweep is cut early wherever the sector would
+    otherwise hold more weight than its capacity, so only the last sector
+    can overflow. Returns one array of order indices per capacity; a
+    sector may be empty.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    capacities = np.asarray(capacities, dtype=np.float64)
+    order = sweep_order(depot, coords)
+
+    cumulative = np.concatenate([[0], np.cumsum(weights[order])])
+    shares = cumulative[-1] * np.cumsum(capacities)[:-1] / capacities.sum()
+    cuts, start = [], 0
+    for share, capacity in zip(shares, capacities):
+        cut = int(np.searchsorted(cumulative, share, side="left"))
+        limit = int(np.searchsorted(cumulative, cumulative[start] + capacity, side="right")) - 1
+        cut = max(min(cut, limit), start)
+        cuts.append(cut)
+        start = cut
+    return np.split(order, cuts)
+
+
+def split_vehicles(capacities, n_clusters):
+    """Share vehicles out into n_clusters fleets of balanced total capacity.
+
+    Each vehicle, in order of preference, joins the fleet with the least
+    capacity so far, so every fleet gets a vehicle before any gets two.
+    Returns one list of vehicle indices per fleet.
+    """
+    assigned = [[] for _ in range(n_clusters)]
+    totals = np.zeros(n_clusters)
+    for i, capacity in enumerate(capacities):
+        k = int(totals.argmin())
+        assigned[k].append(i)
+        totals[k] += capacity
+    return assigned
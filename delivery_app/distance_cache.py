@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from delivery_app.models import DistanceCacheEntry
+
+
+def location_keys(ids, coords):
+    """One int64 per location hashed from its id and (lon, lat).
+
+    The in-process tier is keyed by these, so once a location moves every
+    process misses its old distances, even those that never saw the edit.
+    """
+    return np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(f"{i}:{x!r}:{y!r}".encode(), digest_size=8).digest(),
+                "little",
+                signed=True,
+            )
+            for i, (x, y) in zip(ids, np.asarray(coords, dtype=np.float64).tolist())
+        ],
+        dtype=np.int64,
+    )
+
+
+class DistanceCache:
+    """Two-tier cache of distances in metres between locations.
+
+    The in-process tier is an LRU bounded by the number of cached pairs and
+    keyed by location_keys. Pairs are grouped into one sorted row per origin
+    so a whole row of the routing matrix can be looked up with a single
+    searchsorted call. The durable tier is the DistanceCacheEntry table,
+    which stores each unordered pair of location ids once with
+    origin_id < destination_id; a moved location's rows are deleted there,
+    and rows older than DISTANCE_CACHE_MAX_AGE are pruned.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.size = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, ids):
+        """Fill a matrix for location keys from the LRU tier, returning (matrix, known)."""
+        ids = np.asarray(ids)
+        n = len(ids)
+        matrix = np.zeros((n, n), dtype=np.int32)
+        known = np.eye(n, dtype=bool)
+
+        for i, origin in enumerate(ids.tolist()):
+            with self._lock:
+                row = self._rows.get(origin)
+                if row is not None:
+                    self._rows.move_to_end(origin)
+            if row is None or not len(row[0]):
+                continue
+
+            row_ids, row_distances = row
+            pos = np.minimum(np.searchsorted(row_ids, ids), len(row_ids) - 1)
+            found = row_ids[pos] == ids
+            matrix[i, found] = row_distances[pos[found]]
+            known[i] |= found
+
+        mirrored = known.T & ~known
+        matrix[mirrored] = matrix.T[mirrored]
+        known |= mirrored
+        return matrix, known
+
+    def fetch(self, ids, subset, matrix, known):
+        """Fill pairs touching the subset indices from the durable tier in place."""
+        position = {location_id: i for i, location_id in enumerate(ids)}
+        subset_ids = [ids[i] for i in subset]
+        entries = DistanceCacheEntry.objects.filter(
+            Q(origin_id__in=subset_ids, destination_id__in=ids)
+            | Q(destination_id__in=subset_ids, origin_id__in=ids)
+        ).values_list("origin_id", "destination_id", "distance")
+
+        for origin, destination, distance in entries.iterator(chunk_size=5000):
+            i, j = position[origin], position[destination]
+            matrix[i, j] = matrix[j, i] = distance
+            known[i, j] = known[j, i] = True
+
+    def store(self, keys, matrix, rows):
+        """Cache the given matrix rows in the LRU tier under location keys."""
+        keys = np.asarray(keys)
+        for i in rows:
+            self._store_row(int(keys[i]), keys, matrix[i])
+
+    def persist(self, ids, matrix, rows):
+        """Write the pairs of the given matrix rows to the durable tier."""
+        if not len(rows):
+            return
+        ids = np.asarray(ids)
+        rows = np.asarray(rows)
+        origins = np.repeat(ids[rows], len(ids))
+        destinations = np.tile(ids, len(rows))
+        pairs = np.stack(
+            [np.minimum(origins, destinations), np.maximum(origins, destinations)], axis=1
+        )
+        pairs, first = np.unique(pairs, axis=0, return_index=True)
+        distances = matrix[rows].ravel()[first]
+        distinct = pairs[:, 0] != pairs[:, 1]
+
+        DistanceCacheEntry.objects.bulk_create(
+            [
+                DistanceCacheEntry(origin_id=a, destination_id=b, distance=d)
+                for (a, b), d in zip(
+                    pairs[distinct].tolist(), distances[distinct].tolist()
+                )
+            ],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+
+    def _store_row(self, origin, ids, distances):
+        with self._lock:
+            old = self._rows.pop(origin, None)
+            if old is not None:
+                self.size -= len(old[0])
+                ids = np.concatenate([ids, old[0]])
+                distances = np.concatenate([distances, old[1]])
+
+            row_ids, first = np.unique(ids, return_index=True)
+            self._rows[origin] = (row_ids, distances[first].astype(np.int32))
+            self.size += len(row_ids)
+
+            while self.size > self.max_entries and len(self._rows) > 1:
+                _, (evicted, _) = self._rows.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, location_id):
+        """Forget the durable distances involving location_id.
+
+        In-process rows need no invalidation: the location's new
+        coordinates give it a new key, and the old rows age out of the LRU.
+        """
+        DistanceCacheEntry.objects.filter(
+            Q(origin_id=location_id) | Q(destination_id=location_id)
+        ).delete()
+
+    def prune(self, max_age=None):
+        """Delete durable pairs older than max_age seconds (default DISTANCE_CACHE_MAX_AGE)."""
+        max_age = settings.DISTANCE_CACHE_MAX_AGE if max_age is None else max_age
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        return DistanceCacheEntry.objects.filter(created_at__lt=cutoff).delete()[0]
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self.size = 0
+
+
+distance_cache = DistanceCache(settings.DISTANCE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,159 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+from django.db import IntegrityError, transaction
+from django.contrib.gis.geos import Point
+from delivery_app.locations import resolve_locations
+from delivery_app.models import Order
+from delivery_app.store_index import store_index
+from delivery_app.utils import count_orders_added, delivery_for, point_coordinates
+
+REQUIRED_FIELDS = ["order_id", "weight", "date_of_order", "address", "latitude", "longitude"]
+
+
+def iter_csv_rows(stream):
+    """Yield one dict per CSV record of a text stream, reading it lazily."""
+    yield from csv.DictReader(stream)
+
+
+def iter_ndjson_rows(stream):
+    """Yield one dict per NDJSON line, or the ValueError for lines that do not parse."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e.msg}")
+            continue
+        yield row if isinstance(row, dict) else ValueError("Expected a JSON object")
+
+
+def iter_rows(stream, fmt):
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    if fmt == "ndjson":
+        return iter_ndjson_rows(stream)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def parse_order_row(row):
+    """Validate one input row and return the values needed to create its order."""
+    if isinstance(row, Exception):
+        raise row
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    weight = float(row["weight"])
+    if weight <= 0:
+        raise ValueError("Weight must be positive")
+    latitude, longitude = float(row["latitude"]), float(row["longitude"])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Coordinates out of range")
+
+    return {
+        "order_id": str(row["order_id"]),
+        "weight": weight,
+        "date_of_order": date.fromisoformat(str(row["date_of_order"])),
+        "address": row["address"],
+        "point": Point(longitude, latitude, srid=4326),
+    }
+
+
+def import_order_batch(batch, errors):
+    """Insert one batch of parsed rows and update each affected delivery once.
+
+    Rows whose order_id already exists, or repeats an earlier row of the
+    batch, are reported as errors. Orders are inserted already attached
+    to their delivery.
+    """
+    seen = set()
+    existing = set(
+        Order.objects.filter(
+            order_id__in=[values["order_id"] for _, values in batch]
+        ).values_list("order_id", flat=True)
+    )
+    accepted = []
+    for line, values in batch:
+        if values["order_id"] in existing or values["order_id"] in seen:
+            errors.append({"row": line, "error": f"Duplicate order_id {values['order_id']}"})
+            continue
+        seen.add(values["order_id"])
+        accepted.append((line, values))
+    if not accepted:
+        return 0
+
+    try:
+        orders = insert_orders([values for _, values in accepted])
+    except IntegrityError:
+        # Another import committed one of these order_ids after the check.
+        errors.extend(
+            {"row": line, "error": "Not imported: a concurrent import added a duplicate order_id"}
+            for line, _ in accepted
+        )
+        return 0
+    return len(orders)
+
+
+def insert_orders(rows):
+    """Create the orders of parsed rows, attached to their deliveries, in one transaction."""
+    with transaction.atomic():
+        locations = resolve_locations([(values["address"], values["point"]) for values in rows])
+        stores = store_index.nearest_many(
+            point_coordinates([values["point"] for values in rows])
+        )
+        deliveries = {}
+        for store, values in zip(stores, rows):
+            key = (store.id, values["date_of_order"])
+            if key not in deliveries:
+                deliveries[key] = delivery_for(store, values["date_of_order"])
+        orders = Order.objects.bulk_create(
+            [
+                Order(
+                    order_id=values["order_id"],
+                    weight=values["weight"],
+                    date_of_order=values["date_of_order"],
+                    delivery_location=location,
+                    delivery=deliveries[store.id, values["date_of_order"]],
+                )
+                for values, location, store in zip(rows, locations, stores)
+            ]
+        )
+
+        added = {}
+        for order in orders:
+            added.setdefault(order.delivery, []).append(order)
+        for delivery, group in added.items():
+            count_orders_added(delivery, group)
+    return orders
+
+
+def import_orders(rows, batch_size=1000):
+    """Import orders from an iterable of row dicts in batches.
+
+    Returns a report with the number of created orders and one entry per
+    rejected row, numbered from 1 in input order.
+    """
+    if not store_index.stores():
+        raise ValueError("No store is defined in the system.")
+
+    report = {"created": 0, "errors": []}
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        for line, row in chunk:
+            try:
+                batch.append((line, parse_order_row(row)))
+            except (ValueError, TypeError) as e:
+                report["errors"].append({"row": line, "error": str(e)})
+        report["created"] += import_order_batch(batch, report["errors"])
+
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
@@ -0,0 +1,222 @@
+import time
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from delivery_app.distance_cache import distance_cache
+from delivery_app.metrics import SolveTrace
+from delivery_app.models import SolveJob
+from delivery_app.plans import load_delivery, route_plans_for_delivery
+
+logger = logging.getLogger(__name__)
+
+
+# Advisory lock key held while a solve job is submitted
+SOLVE_QUEUE_LOCK = 0x534F4C56
+
+# Seconds between prunes of the durable distance cache by each worker
+PRUNE_INTERVAL = 3600
+
+
+class QueueFull(Exception):
+    """Raised when SOLVE_QUEUE_LIMIT solve jobs are already queued or running."""
+
+
+def lock_queue():
+    """Serialize submissions until the transaction ends, so the queue limit holds.
+
+    Uses a PostgreSQL transaction-level advisory lock; other databases
+    rely on the unique active job constraint alone.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SOLVE_QUEUE_LOCK])
+
+
+def active_job(delivery):
+    return (
+        SolveJob.objects.select_for_update()
+        .filter(delivery=delivery, status__in=SolveJob.ACTIVE_STATUSES)
+        .first()
+    )
+
+
+def submit_solve_job(delivery, resolve=False, deadline=None):
+    """Queue a solve for a delivery and return the job without waiting for it.
+
+    A delivery that already has an active job gets that job back instead of
+    a second one, so repeated requests coalesce. deadline caps the solve
+    at that many seconds; while the job is still queued, a coalesced
+    request can tighten it but never loosen it.
+    """
+    with transaction.atomic():
+        lock_queue()
+        job = active_job(delivery)
+        if job is not None:
+            if job.status == SolveJob.QUEUED:
+                updated = []
+                if resolve and not job.resolve:
+                    job.resolve = True
+                    updated.append("resolve")
+                if deadline is not None and (job.deadline is None or deadline < job.deadline):
+                    job.deadline = deadline
+                    updated.append("deadline")
+                if updated:
+                    job.save(update_fields=updated)
+            return job
+
+        active = SolveJob.objects.filter(status__in=SolveJob.ACTIVE_STATUSES).count()
+        if active >= settings.SOLVE_QUEUE_LIMIT:
+            raise QueueFull(f"{active} solve jobs are already pending.")
+
+        try:
+            with transaction.atomic():
+                return SolveJob.objects.create(
+                    delivery=delivery, resolve=resolve, deadline=deadline
+                )
+        except IntegrityError:
+            # Another submission for this delivery committed first.
+            return active_job(delivery)
+
+
+def requeue_stale_jobs():
+    """Put jobs whose worker stopped sending heartbeats back on the queue.
+
+    A stale job that has already been claimed SOLVE_MAX_ATTEMPTS times is
+    failed instead, so a delivery that kills its worker every time does
+    not hold a queue slot forever. Returns the number of jobs requeued.
+    """
+    now = timezone.now()
+    stale = SolveJob.objects.filter(
+        status=SolveJob.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=settings.SOLVE_JOB_TIMEOUT),
+    )
+    stale.filter(attempts__gte=settings.SOLVE_MAX_ATTEMPTS).update(
+        status=SolveJob.FAILED,
+        progress="failed",
+        error=(
+            f"Worker stopped responding on each of {settings.SOLVE_MAX_ATTEMPTS} attempts; "
+            "not retrying."
+        ),
+        finished_at=now,
+    )
+    return stale.update(status=SolveJob.QUEUED, started_at=None, heartbeat_at=None, progress="")
+
+
+class Heartbeat:
+    """Stamp a running job's heartbeat_at every SOLVE_HEARTBEAT_INTERVAL seconds.
+
+    The stamps come from a background thread with its own connection, so
+    a solve that is slow but alive is never taken for a dead worker.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(settings.SOLVE_HEARTBEAT_INTERVAL):
+                owned_job(self.job).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def claim_next_job():
+    """Atomically take the oldest queued job, skipping rows other workers hold."""
+    with transaction.atomic():
+        job = (
+            SolveJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SolveJob.QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = SolveJob.RUNNING
+        job.progress = "claimed"
+        job.attempts += 1
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=["status", "progress", "attempts", "started_at", "heartbeat_at"])
+    return job
+
+
+def owned_job(job):
+    """The job's row while this claim of it is still running, so a requeued job is left alone."""
+    return SolveJob.objects.filter(id=job.id, status=SolveJob.RUNNING, started_at=job.started_at)
+
+
+def set_progress(job, progress):
+    job.progress = progress
+    owned_job(job).update(progress=progress)
+
+
+def run_job(job):
+    """Solve the job's delivery and record the outcome and solve trace on the job row.
+
+    The outcome is only recorded while this worker still owns the job; if
+    the job was requeued or failed as stale meanwhile, it is discarded.
+    """
+    trace = SolveTrace(job.delivery_id)
+    try:
+        with Heartbeat(job), trace.capture():
+            set_progress(job, "loading")
+            with trace.phase("load"):
+                delivery = load_delivery(job.delivery_id)
+            set_progress(job, "solving")
+            route_plans_for_delivery(
+                delivery, resolve=job.resolve, trace=trace, deadline=job.deadline
+            )
+        job.status = SolveJob.DONE
+        job.progress = "done"
+    except Exception as e:
+        logger.exception(f"Solve job {job.id} failed")
+        job.status = SolveJob.FAILED
+        job.progress = "failed"
+        job.error = str(e)
+
+    job.stats = trace.log()
+    job.finished_at = timezone.now()
+    owned = owned_job(job).update(
+        status=job.status,
+        progress=job.progress,
+        error=job.error,
+        stats=job.stats,
+        finished_at=job.finished_at,
+    )
+    if not owned:
+        logger.warning(f"Solve job {job.id} was taken from this worker; discarding its outcome")
+    return job
+
+
+def run_worker(poll_interval=1.0, once=False):
+    """Pull jobs from the queue until interrupted, or until it is empty with once=True.
+
+    Every PRUNE_INTERVAL seconds the worker also prunes old durable
+    distance cache pairs.
+    """
+    pruned_at = None
+    while True:
+        close_old_connections()
+        requeue_stale_jobs()
+        if pruned_at is None or time.monotonic() - pruned_at > PRUNE_INTERVAL:
+            distance_cache.prune()
+            pruned_at = time.monotonic()
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
@@ -0,0 +1,86 @@
+import math
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geos import MultiPoint
+from scipy.spatial import cKDTree
+from delivery_app.models import Location
+from delivery_app.road_network import EARTH_RADIUS_M
+from delivery_app.utils import point_coordinates, unit_vectors
+
+
+def chord_length(metres):
+    """Straight-line distance on the unit sphere spanning an arc of metres."""
+    return 2 * math.sin(metres / (2 * EARTH_RADIUS_M))
+
+
+def nearby_locations(points, tolerance):
+    """Order locations within about tolerance metres of any of points, in one query.
+
+    Store locations are never candidates. The ST_DWithin prefilter runs
+    in degrees on the spatial index, widened to the longitude span of
+    tolerance at the batch's highest latitude so no location within
+    tolerance is missed.
+    """
+    max_lat = max(abs(point.y) for point in points)
+    degrees = tolerance / (111_320 * max(math.cos(math.radians(max_lat)), 0.01))
+    return list(
+        Location.objects.filter(
+            order__isnull=False,
+            point__dwithin=(MultiPoint(points, srid=4326), degrees),
+        ).distinct()
+    )
+
+
+def snap_points(points, tolerance=None):
+    """Move each point onto a nearby delivery stop so orders there share coordinates.
+
+    A point within tolerance metres (default LOCATION_SNAP_METRES) of an
+    existing order location takes the nearest one's coordinates. The
+    remaining points are grouped so points close to an earlier point of
+    the batch take its coordinates. A tolerance of 0 disables snapping.
+    """
+    tolerance = settings.LOCATION_SNAP_METRES if tolerance is None else tolerance
+    if not points or tolerance <= 0:
+        return list(points)
+
+    radius = chord_length(tolerance)
+    vectors = unit_vectors(point_coordinates(points))
+    snapped = [None] * len(points)
+
+    existing = nearby_locations(points, tolerance)
+    if existing:
+        tree = cKDTree(unit_vectors(point_coordinates([loc.point for loc in existing])))
+        distances, nearest = tree.query(vectors, distance_upper_bound=radius)
+        for i, (distance, j) in enumerate(zip(distances, nearest)):
+            if np.isfinite(distance):
+                snapped[i] = existing[j].point.clone()
+
+    pending = [i for i, point in enumerate(snapped) if point is None]
+    if pending:
+        tree = cKDTree(vectors[pending])
+        for i in pending:
+            if snapped[i] is not None:
+                continue
+            for other in tree.query_ball_point(vectors[i], radius):
+                if snapped[pending[other]] is None:
+                    snapped[pending[other]] = points[i].clone()
+    return snapped
+
+
+def resolve_locations(rows, tolerance=None):
+    """Create one Location per (address, point) row, snapped onto nearby stops.
+
+    Every order keeps a location and address of its own; snapping only
+    gives orders at one stop identical coordinates, which routing_data
+    collapses into a single node.
+    """
+    if not rows:
+        return []
+    points = snap_points([point for _, point in rows], tolerance)
+    return Location.objects.bulk_create(
+        [Location(address=address, point=point) for (address, _), point in zip(rows, points)]
+    )
+
+
+def resolve_location(address, point, tolerance=None):
+    return resolve_locations([(address, point)], tolerance)[0]
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime
+from itertools import product
+from django.core.management.base import BaseCommand, CommandError
+from delivery_app.benchmark import compare_runs, run_benchmark, scaling_series
+
+
+class Command(BaseCommand):
+    help = "Benchmark the routing pipeline phase by phase on seeded synthetic instances."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--orders", type=int, nargs="+", default=[50, 100, 200, 400],
+            help="Order counts to benchmark.",
+        )
+        parser.add_argument(
+            "--vehicles", type=int, nargs="+", default=[5],
+            help="Fleet sizes to benchmark.",
+        )
+        parser.add_argument(
+            "--tightness", type=float, nargs="+", default=[0.8],
+            help="Total order weight as a fraction of fleet capacity.",
+        )
+        parser.add_argument(
+            "--spread", type=float, nargs="+", default=[10.0],
+            help="Radius in kilometres over which orders are scattered.",
+        )
+        parser.add_argument(
+            "--seeds", type=int, default=1,
+            help="Number of seeded instances per configuration.",
+        )
+        parser.add_argument(
+            "--time-limit", type=float,
+            help="Fixed solver time limit per strategy in seconds. Defaults to the adaptive budget.",
+        )
+        parser.add_argument(
+            "--skip-db", action="store_true",
+            help="Skip the database write phase.",
+        )
+        parser.add_argument(
+            "--neighbours", type=int,
+            help="Also solve the sparse model with this many candidates per order "
+            "and report its gap to the dense model.",
+        )
+        parser.add_argument("--output", help="Write the report as JSON to this path.")
+        parser.add_argument("--compare", help="Baseline JSON report to compare against.")
+
+    def handle(self, *args, **options):
+        runs = []
+        configurations = product(
+            options["orders"], options["vehicles"], options["tightness"], options["spread"]
+        )
+        for n_orders, n_vehicles, tightness, spread_km in configurations:
+            for seed in range(options["seeds"]):
+                run = run_benchmark(
+                    n_orders,
+                    n_vehicles,
+                    tightness,
+                    spread_km,
+                    seed,
+                    options["time_limit"],
+                    write_db=not options["skip_db"],
+                    neighbours=options["neighbours"],
+                )
+                runs.append(run)
+                phases = ", ".join(f"{name} {s:.3f}s" for name, s in run["phases"].items())
+                self.stdout.write(
+                    f"{n_orders} orders / {n_vehicles} vehicles / tightness {tightness} / "
+                    f"{spread_km} km / seed {seed}: best {run['best_strategy']}, "
+                    f"peak {run['peak_python_mb']:.1f} MB, {phases}"
+                )
+                if run["sparse"]:
+                    gaps = ", ".join(
+                        f"{label} {gap:+.2f}%" for label, gap in run["sparse"]["gap_pct"].items()
+                    )
+                    self.stdout.write(
+                        f"  sparse k={run['sparse']['neighbours']}: gap {gaps or 'n/a'}, "
+                        f"{run['sparse']['dense_fallbacks']} dense fallbacks"
+                    )
+
+        report = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "time_limit": options["time_limit"],
+            "runs": runs,
+            "scaling": scaling_series(runs),
+        }
+        for series in report["scaling"]:
+            self.stdout.write(
+                f"Scaling for {series['n_vehicles']} vehicles / tightness {series['tightness']} / "
+                f"{series['spread_km']} km (time ~ n^{series['exponent']}):"
+            )
+            for point in series["points"]:
+                self.stdout.write(
+                    f"  {point['n_orders']:>6} orders: total {point['total_seconds']:.3f}s, "
+                    f"solve {point['solve_seconds']:.3f}s, peak {point['peak_python_mb']:.1f} MB"
+                )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+            for row in compare_runs(baseline, report):
+                self.stdout.write(f"{row['instance']}:")
+                for metric in ("phases", "cost_km"):
+                    for name, (old, new) in row[metric].items():
+                        if old is None or new is None:
+                            self.stdout.write(f"  {name}: {old} -> {new}")
+                            continue
+                        change = (new - old) / old * 100 if old else 0.0
+                        self.stdout.write(f"  {name}: {old:.3f} -> {new:.3f} ({change:+.1f}%)")
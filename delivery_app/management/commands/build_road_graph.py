@@ -0,0 +1,67 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from delivery_app.road_network import build_road_graph
+
+DRIVABLE_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "unclassified",
+    "residential", "living_street", "service", "road",
+}
+
+
+class Command(BaseCommand):
+    help = "Build a compact road graph for routing from a local OSM extract (.osm.pbf)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="OSM extract to read, e.g. nashik.osm.pbf.")
+        parser.add_argument("output", help="Where to write the graph (.npz).")
+
+    def handle(self, *args, **options):
+        try:
+            import osmium
+        except ImportError:
+            raise CommandError("Reading OSM extracts requires the osmium package.")
+
+        node_ids, coords = {}, []
+        origins, destinations, oneway = [], [], []
+
+        def node_index(location_ref):
+            index = node_ids.get(location_ref.ref)
+            if index is None:
+                index = node_ids[location_ref.ref] = len(coords)
+                coords.append((location_ref.lon, location_ref.lat))
+            return index
+
+        try:
+            ways = osmium.FileProcessor(options["path"]).with_locations()
+            for way in ways:
+                if not way.is_way() or way.tags.get("highway") not in DRIVABLE_HIGHWAYS:
+                    continue
+                direction = way.tags.get("oneway", "no")
+                if direction == "reversible":
+                    continue
+                refs = [node_index(ref) for ref in way.nodes]
+                if direction == "-1":
+                    refs.reverse()
+                is_oneway = direction in ("yes", "1", "true", "-1") or (
+                    way.tags.get("junction") == "roundabout" and direction != "no"
+                )
+                for a, b in zip(refs, refs[1:]):
+                    origins.append(a)
+                    destinations.append(b)
+                    oneway.append(is_oneway)
+        except (OSError, RuntimeError) as e:
+            raise CommandError(str(e))
+        if not origins:
+            raise CommandError("ERROR: No drivable roads found in the extract.")
+
+        graph = build_road_graph(
+            np.array(coords, dtype=np.float64), origins, destinations, oneway
+        )
+        np.savez(options["output"], **graph)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {len(graph['coords'])} nodes and {len(graph['indices'])} "
+                f"road segments to {options['output']}"
+            )
+        )
@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from delivery_app.models import Delivery
+from delivery_app.plans import load_delivery
+from delivery_app.utils import solve_route_variants
+
+
+class Command(BaseCommand):
+    help = "Solve a delivery with the dense and the sparse k-nearest-neighbour model and report the gap."
+
+    def add_arguments(self, parser):
+        parser.add_argument("delivery_id", type=int)
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=settings.ROUTING_SPARSE_NEIGHBOURS or 15,
+            help="Candidate successors kept per order in the sparse model.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            delivery = load_delivery(options["delivery_id"])
+        except Delivery.DoesNotExist:
+            raise CommandError("Delivery not found")
+
+        results = {}
+        for label, neighbours in (("dense", 0), ("sparse", options["neighbours"])):
+            started = time.perf_counter()
+            variants, _ = solve_route_variants(
+                delivery.store,
+                list(delivery.orders.all()),
+                list(delivery.vehicles.all()),
+                neighbours=neighbours,
+            )
+            elapsed = time.perf_counter() - started
+            results[label] = {str(v["strategy"]): v["total_distance"] for v in variants}
+            self.stdout.write(f"{label}: {elapsed:.2f}s")
+
+        for strategy, dense_km in results["dense"].items():
+            sparse_km = results["sparse"].get(strategy)
+            if sparse_km is None:
+                self.stdout.write(f"{strategy}: dense {dense_km:.3f} km, sparse found no solution")
+                continue
+            gap = (sparse_km - dense_km) / dense_km * 100 if dense_km else 0.0
+            self.stdout.write(
+                f"{strategy}: dense {dense_km:.3f} km, sparse {sparse_km:.3f} km, gap {gap:+.2f}%"
+            )
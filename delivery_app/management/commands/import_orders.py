@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from delivery_app.ingest import import_orders, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import orders from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows inserted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+
+        try:
+            with open(path, encoding="utf-8", newline="") as stream:
+                report = import_orders(iter_rows(stream, fmt), options["batch_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report['created']} orders, {len(report['errors'])} rows rejected."
+            )
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from delivery_app.models import DailyDeliveryStats
+from delivery_app.plans import planning_queryset, stored_route_plans
+from delivery_app.stats import refresh_delivery_stats, stats_row
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily delivery statistics from orders, vehicles and stored plans."
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        for delivery in planning_queryset().iterator(chunk_size=500):
+            refresh_delivery_stats(delivery.id, mark_stale=False)
+            variants = stored_route_plans(delivery)
+            stats = stats_row(delivery)
+            if variants:
+                stats.planned_distance = min(v["total_distance"] for v in variants)
+                stats.plan_status = DailyDeliveryStats.PLANNED
+            elif delivery.route_plans.exists():
+                stats.plan_status = DailyDeliveryStats.STALE
+            else:
+                stats.planned_distance = None
+                stats.plan_status = DailyDeliveryStats.UNPLANNED
+            stats.save(update_fields=["planned_distance", "plan_status"])
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {rebuilt} deliveries."))
@@ -0,0 +1,53 @@
+import multiprocessing
+from django.conf import settings
+from django.db import connections
+from django.core.management.base import BaseCommand
+from delivery_app.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run worker processes that pull route solve jobs from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SOLVE_WORKERS,
+            help="Number of worker processes to start.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        kwargs = {"poll_interval": options["poll_interval"], "once": options["once"]}
+
+        if workers == 1:
+            self.stdout.write("Starting 1 solve worker.")
+            run_worker(**kwargs)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_worker, kwargs=kwargs)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {workers} solve workers.")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
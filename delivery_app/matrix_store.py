@@ -0,0 +1,90 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from django.conf import settings
+
+
+def matrix_key(coords, metric):
+    """Hash the (lon, lat) rows and metric a distance matrix was computed from."""
+    digest = hashlib.sha256(f"{metric};".encode())
+    digest.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class MatrixStore:
+    """On-disk int32 distance matrices, mapped read-only instead of copied.
+
+    A matrix is written once as an .npy file named by its key and every
+    reader, including the solver worker processes, maps that file, so
+    concurrent solves of one instance share its pages through the OS page
+    cache. Files unread for max_age seconds are removed, then the least
+    recently read ones until the directory holds at most max_bytes. Files
+    read within the last grace seconds are never removed, so a path just
+    handed to a solver worker stays valid while it maps the file.
+    """
+
+    def __init__(self, directory, max_bytes, max_age, grace=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.grace = grace
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        """Map a stored matrix read-only, or return None when it is not stored."""
+        path = self.path(key)
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return matrix
+
+    def put(self, key, matrix):
+        """Write a matrix under key and return it mapped read-only from disk."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(matrix, dtype=np.int32))
+        self.evict()
+        os.replace(tmp, self.path(key))
+        return np.load(self.path(key), mmap_mode="r")
+
+    def evict(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".npy"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+
+            now, total = time.time(), sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if now - mtime <= self.grace:
+                    break
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+matrix_store = (
+    MatrixStore(
+        settings.ROUTING_MATRIX_DIR,
+        settings.ROUTING_MATRIX_STORE_MAX_BYTES,
+        settings.ROUTING_MATRIX_STORE_MAX_AGE,
+        settings.ROUTING_MATRIX_STORE_GRACE,
+    )
+    if settings.ROUTING_MATRIX_DIR
+    else None
+)
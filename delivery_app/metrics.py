@@ -0,0 +1,168 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimer:
+    """Accumulate wall-clock seconds per named phase."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+
+class SolveTrace(PhaseTimer):
+    """Phase timings, solver statistics and SQL query count of one delivery solve."""
+
+    def __init__(self, delivery_id=None):
+        super().__init__()
+        self.delivery_id = delivery_id
+        self.queries = 0
+        self.strategies = {}
+        self._started = time.perf_counter()
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def capture(self):
+        """Count the queries run on the default connection while the block runs."""
+        with connection.execute_wrapper(self._count_query):
+            yield
+
+    def add_solver_stats(self, strategy, stats):
+        self.strategies.setdefault(strategy, []).append(stats)
+
+    def summary(self):
+        return {
+            "delivery_id": self.delivery_id,
+            "wall_seconds": round(time.perf_counter() - self._started, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "sql_queries": self.queries,
+            "strategies": self.strategies,
+        }
+
+    def log(self):
+        summary = self.summary()
+        logger.info(json.dumps({"event": "route_solve", **summary}))
+        return summary
+
+
+class Metrics:
+    """Thread-safe in-process counters and summaries rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}
+
+    def describe(self, name, kind, help_text):
+        self._types[name] = kind
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        self.inc(f"{name}_sum", value, **labels)
+        self.inc(f"{name}_count", 1, **labels)
+
+    def samples(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self, extra=()):
+        """Render the registry, followed by extra (name, labels, value) samples."""
+        samples = [(name, dict(labels), value) for (name, labels), value in self.samples()]
+        lines, described = [], set()
+        for name, labels, value in samples + list(extra):
+            family = name.removesuffix("_sum").removesuffix("_count")
+            if family in self._types and family not in described:
+                lines.append(f"# HELP {family} {self._help[family]}")
+                lines.append(f"# TYPE {family} {self._types[family]}")
+                described.add(family)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = Metrics()
+metrics.describe("http_requests", "counter", "HTTP requests served, by view and status.")
+metrics.describe("http_request_seconds", "summary", "HTTP request latency in seconds, by view.")
+metrics.describe("http_request_sql_queries", "summary", "SQL queries per HTTP request, by view.")
+metrics.describe(
+    "solve_jobs", "gauge", "Solve jobs queued, running, or finished within the metrics window, by status."
+)
+metrics.describe(
+    "solve_phase_seconds", "summary", "Seconds spent per phase of solves finished within the window."
+)
+metrics.describe("solve_sql_queries", "summary", "SQL queries per solve finished within the window.")
+metrics.describe("solve_solutions", "summary", "Solutions found per strategy solve within the window.")
+metrics.describe(
+    "solve_time_limit_hits", "gauge", "Strategy solves within the window stopped by their time limit."
+)
+
+
+def solve_job_samples(jobs):
+    """Aggregate (status, stats) pairs of SolveJob rows into (name, labels, value) samples.
+
+    Solves run in worker processes, so their statistics are read back
+    from the stats stored on each finished job rather than from this
+    process's registry. Callers pass only active and recently finished
+    jobs, so a scrape does not grow with the job history.
+    """
+    statuses, phases, solutions, hits = {}, {}, {}, {}
+    queries, solves = 0, 0
+    for status, stats in jobs:
+        statuses[status] = statuses.get(status, 0) + 1
+        if not stats:
+            continue
+        solves += 1
+        queries += stats.get("sql_queries", 0)
+        for phase, seconds in stats.get("phases", {}).items():
+            total, count = phases.get(phase, (0.0, 0))
+            phases[phase] = (total + seconds, count + 1)
+        for strategy, parts in stats.get("strategies", {}).items():
+            for part in parts:
+                total, count = solutions.get(strategy, (0, 0))
+                solutions[strategy] = (total + part["solutions"], count + 1)
+                hits[strategy] = hits.get(strategy, 0) + int(part["time_limit_hit"])
+
+    samples = [("solve_jobs", {"status": s}, count) for s, count in sorted(statuses.items())]
+    for phase, (total, count) in sorted(phases.items()):
+        samples.append(("solve_phase_seconds_sum", {"phase": phase}, round(total, 4)))
+        samples.append(("solve_phase_seconds_count", {"phase": phase}, count))
+    samples.append(("solve_sql_queries_sum", {}, queries))
+    samples.append(("solve_sql_queries_count", {}, solves))
+    for strategy, (total, count) in sorted(solutions.items()):
+        samples.append(("solve_solutions_sum", {"strategy": strategy}, total))
+        samples.append(("solve_solutions_count", {"strategy": strategy}, count))
+    for strategy, count in sorted(hits.items()):
+        samples.append(("solve_time_limit_hits", {"strategy": strategy}, count))
+    return samples
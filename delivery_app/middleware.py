@@ -0,0 +1,66 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection
+from delivery_app.metrics import metrics
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries run through it."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        connection.execute_wrappers.remove(self)
+
+
+class QueryCountMiddleware:
+    """Count the SQL queries and time of each request into the metrics registry.
+
+    The middleware is async-capable so async views under ASGI are awaited
+    on the event loop instead of being pushed through a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter, started = QueryCounter(), time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.record(request, response, counter.queries, started)
+
+    async def __acall__(self, request):
+        # Connections are per thread and the async ORM runs its queries in
+        # the request's thread-sensitive worker, so the counter goes there.
+        counter, started = QueryCounter(), time.perf_counter()
+        await sync_to_async(counter.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counter.uninstall)()
+        return self.record(request, response, counter.queries, started)
+
+    def record(self, request, response, queries, started):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        metrics.inc("http_requests", view=view, status=response.status_code)
+        metrics.observe("http_request_seconds", elapsed, view=view)
+        metrics.observe("http_request_sql_queries", queries, view=view)
+        response["X-SQL-Queries"] = str(queries)
+        return response
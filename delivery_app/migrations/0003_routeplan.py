@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("delivery_app", "0002_distancecacheentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoutePlan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=64)),
+                ("position", models.PositiveSmallIntegerField()),
+                ("strategy", models.CharField(max_length=64)),
+                ("total_distance", models.FloatField(help_text="Total distance in kilometres")),
+                ("vehicle_routes", models.JSONField()),
+                ("solver", models.JSONField(blank=True, default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "delivery",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="route_plans",
+                        to="delivery_app.delivery",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["delivery", "position"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("delivery", "fingerprint", "position"),
+                        name="unique_route_plan_variant",
+                    )
+                ],
+            },
+        ),
+    ]
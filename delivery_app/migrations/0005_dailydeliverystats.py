@@ -0,0 +1,71 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("delivery_app", "0004_solvejob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyDeliveryStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                ("total_weight", models.FloatField(default=0)),
+                ("vehicle_count", models.PositiveIntegerField(default=0)),
+                (
+                    "planned_distance",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Distance of the best stored plan in kilometres",
+                        null=True,
+                    ),
+                ),
+                (
+                    "plan_status",
+                    models.CharField(
+                        choices=[
+                            ("unplanned", "Unplanned"),
+                            ("planned", "Planned"),
+                            ("stale", "Stale"),
+                        ],
+                        default="unplanned",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "delivery",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="delivery_app.delivery",
+                    ),
+                ),
+                (
+                    "store",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="delivery_app.store",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["date", "store"], name="delivery_ap_date_9b4909_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(fields=("store", "date"), name="unique_daily_stats")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,155 @@
+from django.db import models
+
+
+class DistanceCacheEntry(models.Model):
+    """Durable tier of the distance cache, one row per unordered location pair."""
+
+    origin = models.ForeignKey(
+        "Location", on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    destination = models.ForeignKey(
+        "Location", on_delete=models.CASCADE, related_name="+"
+    )
+    distance = models.IntegerField(help_text="Distance in metres")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["origin", "destination"], name="unique_distance_pair"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.origin_id} -> {self.destination_id}: {self.distance} m"
+
+
+class RoutePlan(models.Model):
+    """A solved route variant stored for a delivery.
+
+    The fingerprint hashes every solver input of the delivery at solve time
+    (orders, weights, locations and vehicles), so a stored plan is served
+    as-is until one of those inputs changes.
+    """
+
+    delivery = models.ForeignKey(
+        "Delivery", on_delete=models.CASCADE, related_name="route_plans"
+    )
+    fingerprint = models.CharField(max_length=64)
+    position = models.PositiveSmallIntegerField()
+    strategy = models.CharField(max_length=64)
+    total_distance = models.FloatField(help_text="Total distance in kilometres")
+    vehicle_routes = models.JSONField()
+    solver = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["delivery", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["delivery", "fingerprint", "position"],
+                name="unique_route_plan_variant",
+            )
+        ]
+
+    def __str__(self):
+        return f"Delivery #{self.delivery_id} plan {self.position} ({self.strategy})"
+
+    def as_variant(self):
+        return {
+            "vehicle_routes": self.vehicle_routes,
+            "total_distance": self.total_distance,
+            "strategy": self.strategy,
+            "solver": self.solver,
+        }
+
+
+class SolveJob(models.Model):
+    """A queued route solve for a delivery, claimed by a solve_worker process."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = [QUEUED, RUNNING]
+
+    delivery = models.ForeignKey(
+        "Delivery", on_delete=models.CASCADE, related_name="solve_jobs"
+    )
+    resolve = models.BooleanField(default=False)
+    deadline = models.FloatField(
+        null=True, blank=True, help_text="Seconds the solve may take at most"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.CharField(max_length=32, blank=True)
+    attempts = models.PositiveIntegerField(
+        default=0, help_text="Times a worker has claimed the job"
+    )
+    error = models.TextField(blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, help_text="Last sign of life from the worker running the job"
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["finished_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["delivery"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="unique_active_solve_job",
+            )
+        ]
+
+    def __str__(self):
+        return f"Solve job #{self.id} for delivery #{self.delivery_id} ({self.status})"
+
+
+class DailyDeliveryStats(models.Model):
+    """Per store and date summary of a delivery, kept current as orders and plans change."""
+
+    UNPLANNED = "unplanned"
+    PLANNED = "planned"
+    STALE = "stale"
+    PLAN_STATUS_CHOICES = [
+        (UNPLANNED, "Unplanned"),
+        (PLANNED, "Planned"),
+        (STALE, "Stale"),
+    ]
+
+    delivery = models.OneToOneField(
+        "Delivery", on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    store = models.ForeignKey("Store", on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    order_count = models.PositiveIntegerField(default=0)
+    total_weight = models.FloatField(default=0)
+    vehicle_count = models.PositiveIntegerField(default=0)
+    planned_distance = models.FloatField(
+        null=True, blank=True, help_text="Distance of the best stored plan in kilometres"
+    )
+    plan_status = models.CharField(
+        max_length=16, choices=PLAN_STATUS_CHOICES, default=UNPLANNED
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["store", "date"], name="unique_daily_stats")
+        ]
+        indexes = [models.Index(fields=["date", "store"])]
+
+    def __str__(self):
+        return f"{self.date} store #{self.store_id}: {self.order_count} orders"
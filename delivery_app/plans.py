@@ -0,0 +1,133 @@
+import hashlib
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from delivery_app.metrics import SolveTrace
+from delivery_app.models import Delivery, Order, RoutePlan, SolveJob
+from delivery_app.road_network import road_networks
+from delivery_app.stats import record_plan
+from delivery_app.utils import assign_routes_to_delivery, strategy_label
+
+
+def planning_queryset():
+    """Deliveries with everything the solver and the fingerprint read."""
+    return Delivery.objects.select_related("store__location").prefetch_related(
+        Prefetch("orders", queryset=Order.objects.select_related("delivery_location")),
+        "vehicles",
+    )
+
+
+def load_delivery(delivery_id):
+    return planning_queryset().get(id=delivery_id)
+
+
+def plan_fingerprint(store, orders, vehicles):
+    """Hash the solver inputs of a delivery so stored plans can be matched to them."""
+    digest = hashlib.sha256()
+    point = store.location.point
+    digest.update(f"store:{store.id}:{point.x}:{point.y};".encode())
+    network = road_networks.path_for(store)
+    if network is not None:
+        digest.update(f"network:{network};".encode())
+    for order in sorted(orders, key=lambda o: o.id):
+        point = order.delivery_location.point
+        digest.update(f"order:{order.id}:{order.weight}:{point.x}:{point.y};".encode())
+    for vehicle in sorted(vehicles, key=lambda v: v.id):
+        digest.update(
+            f"vehicle:{vehicle.id}:{vehicle.capacity}:{vehicle.average_speed};".encode()
+        )
+    return digest.hexdigest()
+
+
+def save_route_plans(delivery, fingerprint, variants):
+    """Replace the stored plans of a delivery with freshly solved variants."""
+    with transaction.atomic():
+        RoutePlan.objects.filter(delivery=delivery).delete()
+        RoutePlan.objects.bulk_create(
+            [
+                RoutePlan(
+                    delivery=delivery,
+                    fingerprint=fingerprint,
+                    position=position,
+                    strategy=str(variant["strategy"]),
+                    total_distance=variant["total_distance"],
+                    vehicle_routes=variant["vehicle_routes"],
+                    solver=variant.get("solver", {}),
+                )
+                for position, variant in enumerate(variants)
+            ]
+        )
+        record_plan(delivery, variants)
+
+
+def delivery_fingerprint(delivery):
+    return plan_fingerprint(
+        delivery.store, list(delivery.orders.all()), list(delivery.vehicles.all())
+    )
+
+
+def stored_route_plans(delivery):
+    """Return the stored variants of a delivery if they match its current inputs."""
+    plans = RoutePlan.objects.filter(delivery=delivery, fingerprint=delivery_fingerprint(delivery))
+    return [plan.as_variant() for plan in plans] or None
+
+
+def deliveries_to_plan():
+    """Deliveries with orders and no active solve job whose stored plans are missing or stale."""
+    deliveries = (
+        planning_queryset()
+        .filter(orders__isnull=False)
+        .exclude(solve_jobs__status__in=SolveJob.ACTIVE_STATUSES)
+        .distinct()
+    )
+    for delivery in deliveries.iterator(chunk_size=100):
+        if stored_route_plans(delivery) is None:
+            yield delivery
+
+
+def previous_route_plans(delivery):
+    """Map each strategy of the delivery's last stored plan to its vehicle routes.
+
+    Plans stored when strategies were labelled by number are mapped to
+    the strategy's name, so they still seed a warm start.
+    """
+    plans = {}
+    for plan in RoutePlan.objects.filter(delivery=delivery):
+        strategy = plan.strategy
+        if strategy.isdigit():
+            strategy = strategy_label(int(strategy))
+        plans[strategy] = plan.vehicle_routes
+    return plans
+
+
+def route_plans_for_delivery(delivery, resolve=False, trace=None, deadline=None):
+    """Return the route variants of a delivery, solving only when its inputs changed.
+
+    When the inputs changed and ROUTING_WARM_START is on, the outdated plan
+    seeds the new solve. Pass resolve=True to force a cold solve even if a
+    stored plan matches, and deadline to cap the solve at that many seconds.
+    """
+    trace = trace or SolveTrace(delivery.id)
+    previous_routes = None
+    if not resolve:
+        variants = stored_route_plans(delivery)
+        if variants:
+            return variants
+        if settings.ROUTING_WARM_START:
+            previous_routes = previous_route_plans(delivery)
+
+    orders = list(delivery.orders.all())
+    vehicles = list(delivery.vehicles.all())
+    fingerprint = plan_fingerprint(delivery.store, orders, vehicles)
+    variants = assign_routes_to_delivery(
+        delivery.store,
+        orders,
+        vehicles,
+        delivery.date_of_delivery,
+        previous_routes=previous_routes,
+        trace=trace,
+        deadline=deadline,
+    )
+    with trace.phase("save_plans"):
+        save_route_plans(delivery, fingerprint, variants)
+    return variants
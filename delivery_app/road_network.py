@@ -0,0 +1,142 @@
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+from delivery_app.utils import haversine_pairs, unit_vectors
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def build_road_graph(coords, origins, destinations, oneway):
+    """Build the CSR arrays of a directed road graph from its segments.
+
+    coords holds the (lon, lat) of every node, and each segment joins
+    origins[i] to destinations[i], in both directions unless oneway[i].
+    Segments are weighted by their length in whole metres, and only the
+    largest strongly connected component is kept so every snapped
+    location can reach every other.
+    """
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    oneway = np.asarray(oneway, dtype=bool)
+    lengths = np.maximum(haversine_pairs(coords[origins], coords[destinations]), 1)
+
+    tails = np.concatenate([origins, destinations[~oneway]])
+    heads = np.concatenate([destinations, origins[~oneway]])
+    weights = np.concatenate([lengths, lengths[~oneway]])
+    # The CSR constructor sums parallel edges, so keep only the shortest of each.
+    order = np.lexsort((weights, heads, tails))
+    tails, heads, weights = tails[order], heads[order], weights[order]
+    first = np.ones(len(tails), dtype=bool)
+    first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+    first &= tails != heads
+    n = len(coords)
+    graph = csr_matrix((weights[first], (tails[first], heads[first])), shape=(n, n))
+
+    _, labels = connected_components(graph, directed=True, connection="strong")
+    keep = np.flatnonzero(labels == np.bincount(labels).argmax())
+    graph = graph[keep][:, keep].tocsr()
+    return {
+        "indptr": graph.indptr.astype(np.int64),
+        "indices": graph.indices.astype(np.int32),
+        "weights": graph.data.astype(np.int32),
+        "coords": coords[keep],
+    }
+
+
+class RoadNetwork:
+    """A road graph loaded from a prebuilt .npz file, with nearest-node snapping."""
+
+    def __init__(self, path):
+        self.path = path
+        arrays = np.load(path)
+        self.coords = arrays["coords"]
+        n = len(self.coords)
+        self.graph = csr_matrix(
+            (arrays["weights"], arrays["indices"], arrays["indptr"]), shape=(n, n)
+        )
+        self._tree = cKDTree(unit_vectors(self.coords))
+
+    def snap(self, coords):
+        """Nearest graph node of each (lon, lat) row and its distance in metres."""
+        chords, nodes = self._tree.query(unit_vectors(coords))
+        return nodes, 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(chords / 2, 1.0))
+
+    def travel_matrix(self, coords, block_size=64):
+        """Road distances in whole metres between (lon, lat) rows.
+
+        Locations are snapped to their nearest node and each leg adds the
+        straight-line hops onto and off the network. Shortest paths run as
+        Dijkstra from blocks of distinct source nodes at a time, bounding
+        the (block, graph nodes) float temporaries.
+        """
+        nodes, offsets = self.snap(coords)
+        distinct, inverse = np.unique(nodes, return_inverse=True)
+        paths = np.empty((len(distinct), len(distinct)), dtype=np.float64)
+        for start in range(0, len(distinct), block_size):
+            sources = distinct[start:start + block_size]
+            paths[start:start + block_size] = dijkstra(
+                self.graph, directed=True, indices=sources
+            )[:, distinct]
+
+        matrix = paths[inverse][:, inverse] + offsets[:, np.newaxis] + offsets[np.newaxis, :]
+        np.fill_diagonal(matrix, 0)
+        return matrix.astype(np.int32)
+
+    def travel_pairs(self, coords, origins, destinations, block_size=64):
+        """Road distances in whole metres from coords[origins[i]] to coords[destinations[i]].
+
+        Dijkstra runs once per distinct origin node, in blocks, and only
+        the requested pairs are read out of each block, so memory grows
+        with the number of pairs rather than the square of the locations.
+        """
+        nodes, offsets = self.snap(coords)
+        sources, source_of = np.unique(nodes[origins], return_inverse=True)
+        distances = np.empty(len(origins), dtype=np.float64)
+        for start in range(0, len(sources), block_size):
+            paths = dijkstra(
+                self.graph, directed=True, indices=sources[start:start + block_size]
+            )
+            rows = np.flatnonzero((source_of >= start) & (source_of < start + block_size))
+            distances[rows] = paths[source_of[rows] - start, nodes[destinations[rows]]]
+
+        distances += offsets[origins] + offsets[destinations]
+        distances[origins == destinations] = 0
+        return distances.astype(np.int32)
+
+
+class RoadNetworks:
+    """Road networks per store from ROUTING_ROAD_NETWORKS, each loaded once per process.
+
+    A store without an entry, or whose graph fails to load, gets None and
+    is routed on haversine distances.
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, store):
+        return self.paths.get(store.id, self.paths.get("default"))
+
+    def for_store(self, store):
+        path = self.path_for(store)
+        if path is None:
+            return None
+        with self._lock:
+            if path not in self._loaded:
+                try:
+                    self._loaded[path] = RoadNetwork(path)
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning(f"Road network {path} unavailable, using haversine: {e}")
+                    self._loaded[path] = None
+            return self._loaded[path]
+
+
+road_networks = RoadNetworks(settings.ROUTING_ROAD_NETWORKS)
@@ -1,5 +1,15 @@
+from django.db import transaction
 from rest_framework import serializers
-from delivery_app.models import Location, Order, Store, Vehicle, Delivery
+from delivery_app.locations import resolve_location, snap_points
+from delivery_app.models import (
+    Location,
+    Order,
+    Store,
+    Vehicle,
+    Delivery,
+    SolveJob,
+    DailyDeliveryStats,
+)
 
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -17,19 +27,40 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         location_data = validated_data.pop("delivery_location")
-        location = Location.objects.create(**location_data)
-        order = Order.objects.create(delivery_location=location, **validated_data)
+        with transaction.atomic():
+            location = resolve_location(location_data["address"], location_data["point"])
+            order = Order.objects.create(delivery_location=location, **validated_data)
         return order
 
     def update(self, instance, validated_data):
         location_data = validated_data.pop("delivery_location", None)
         if location_data:
+            if "point" in location_data:
+                location_data["point"] = snap_points([location_data["point"]])[0]
             for attr, value in location_data.items():
                 setattr(instance.delivery_location, attr, value)
             instance.delivery_location.save()
         return super().update(instance, validated_data)
 
 
+class LocationBulkUpdateSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Location
+        fields = ["id", "address", "point"]
+        extra_kwargs = {"address": {"required": False}, "point": {"required": False}}
+
+
+class OrderBulkUpdateSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Order
+        fields = ["id", "weight", "date_of_order"]
+        extra_kwargs = {"weight": {"required": False}, "date_of_order": {"required": False}}
+
+
 class StoreSerializer(serializers.ModelSerializer):
     location = LocationSerializer()
 
@@ -53,3 +84,71 @@ class DeliverySerializer(serializers.ModelSerializer):
         if data["total_weight"] > sum(vehicle.capacity for vehicle in data["vehicles"]):
             raise serializers.ValidationError("Total weight exceeds vehicle capacity.")
         return data
+
+
+class SolveJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SolveJob
+        fields = [
+            "id",
+            "delivery",
+            "resolve",
+            "deadline",
+            "status",
+            "progress",
+            "attempts",
+            "error",
+            "stats",
+            "created_at",
+            "started_at",
+            "heartbeat_at",
+            "finished_at",
+        ]
+
+
+class DashboardDeliverySerializer(serializers.ModelSerializer):
+    store_name = serializers.CharField(source="store.name", read_only=True)
+
+    class Meta:
+        model = Delivery
+        fields = ["id", "store", "store_name", "total_weight", "date_of_delivery"]
+
+
+class DashboardOrderSerializer(serializers.ModelSerializer):
+    address = serializers.CharField(source="delivery_location.address", read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ["id", "order_id", "weight", "date_of_order", "address"]
+
+
+class DashboardStoreSerializer(serializers.ModelSerializer):
+    address = serializers.CharField(source="location.address", read_only=True)
+
+    class Meta:
+        model = Store
+        fields = ["id", "name", "address"]
+
+
+class DashboardVehicleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Vehicle
+        fields = ["id", "vehicle_no", "capacity", "average_speed"]
+
+
+class DailyDeliveryStatsSerializer(serializers.ModelSerializer):
+    store_name = serializers.CharField(source="store.name", read_only=True)
+
+    class Meta:
+        model = DailyDeliveryStats
+        fields = [
+            "delivery",
+            "store",
+            "store_name",
+            "date",
+            "order_count",
+            "total_weight",
+            "vehicle_count",
+            "planned_distance",
+            "plan_status",
+        ]
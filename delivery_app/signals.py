@@ -1,33 +1,34 @@
-from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from delivery_app.models import Order, Store, Vehicle, Delivery
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from delivery_app.models import Delivery, Location, Order, Store
+from delivery_app.distance_cache import distance_cache
+from delivery_app.stats import refresh_delivery_stats
+from delivery_app.store_index import store_index
+from delivery_app.utils import add_orders_to_delivery, refresh_delivery_weights
+
+
+@receiver(post_init, sender=Order)
+def remember_delivery(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred delivery_id is not fetched.
+    instance._loaded_delivery_id = instance.__dict__.get("delivery_id")
 
 
 @receiver(post_save, sender=Order)
 def create_or_update_delivery(sender, instance, created, **kwargs):
     if not created:
+        # An order moved to another delivery leaves its previous one stale too.
+        touched = {instance._loaded_delivery_id, instance.delivery_id} - {None}
+        refresh_delivery_weights(touched)
+        for delivery_id in touched:
+            refresh_delivery_stats(delivery_id)
+        instance._loaded_delivery_id = instance.delivery_id
         return
     try:
-        store = Store.objects.first()
+        store = store_index.nearest(instance.delivery_location.point)
         if not store:
             raise ValueError("No store is defined in the system.")
 
-        delivery, created = Delivery.objects.get_or_create(
-            store=store,
-            date_of_delivery=instance.date_of_order,
-            defaults={"total_weight": 0},
-        )
-
-        delivery.orders.add(instance)
-        delivery.total_weight += instance.weight
-
-        if not delivery.vehicles.exists():
-            available_vehicles = Vehicle.objects.all()
-            if available_vehicles.exists():
-                delivery.vehicles.set(available_vehicles)
-
-        delivery.save()
+        add_orders_to_delivery(store, instance.date_of_order, [instance])
 
     except ValueError as ve:
         print(f"Error: {ve}")
@@ -35,3 +36,29 @@ def create_or_update_delivery(sender, instance, created, **kwargs):
     except Exception as e:
         print(f"Unexpected error: {e}")
         raise
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_stats(sender, instance, **kwargs):
+    if instance.delivery_id:
+        refresh_delivery_weights([instance.delivery_id])
+        refresh_delivery_stats(instance.delivery_id)
+
+
+@receiver(m2m_changed, sender=Delivery.vehicles.through)
+def update_vehicle_count(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(instance, Delivery):
+        refresh_delivery_stats(instance.id, mark_stale=False)
+
+
+@receiver(post_save, sender=Location)
+def invalidate_location_distances(sender, instance, created, **kwargs):
+    if not created:
+        distance_cache.invalidate(instance.id)
+        store_index.invalidate()
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store_index(sender, instance, **kwargs):
+    store_index.invalidate()
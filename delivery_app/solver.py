@@ -0,0 +1,280 @@
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ortools.constraint_solver import routing_enums_pb2, pywrapcp
+
+STRATEGIES = [
+    routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC,
+    routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION,
+    routing_enums_pb2.FirstSolutionStrategy.SAVINGS,
+]
+
+# Cost in metres of an arc outside the sparse candidates. Such arcs stay
+# in the model so the first-solution heuristics never dead-end on them.
+NON_CANDIDATE_ARC = 10**9
+
+# Bound on the Distance dimension, in metres; far above any real route.
+MAX_ROUTE_DISTANCE = 2**40
+
+SOLVER_KEYS = (
+    "distance_matrix",
+    "matrix_path",
+    "neighbours",
+    "num_vehicles",
+    "depot",
+    "vehicle_capacities",
+    "vehicle_speeds",
+    "demands",
+)
+
+_pool = None
+
+
+def solver_data(data):
+    """Strip routing data down to what a solver process needs.
+
+    A matrix backed by a file in the matrix store is sent as its path and
+    mapped by the worker instead of being pickled.
+    """
+    data = {key: data.get(key) for key in SOLVER_KEYS}
+    if data["matrix_path"]:
+        data["distance_matrix"] = None
+    return data
+
+
+def routing_matrix(data):
+    """The distance matrix of routing data, mapping it from disk if it was sent by path."""
+    if data["distance_matrix"] is None:
+        return np.load(data["matrix_path"], mmap_mode="r")
+    return data["distance_matrix"]
+
+
+def build_routing_model(data):
+    """Build the OR-Tools manager and routing model for routing data.
+
+    Arc costs are travel times at each vehicle's own speed. All vehicles
+    share one transit over the distance matrix, costed at one unit per
+    metre, and when speeds differ a Distance dimension charges the rest of
+    each vehicle's speed_cost per metre as a span cost; a fleet of one
+    speed is costed in plain metres. A dense matrix is so converted to a
+    native integer matrix once however many speeds the fleet has; sparse
+    models register a callback over the candidate rows instead, which
+    charges a large penalty for any other arc rather than removing it.
+    """
+    costs = [speed_cost(speed) for speed in data["vehicle_speeds"]]
+    matrix = routing_matrix(data)
+    manager = pywrapcp.RoutingIndexManager(len(matrix), data["num_vehicles"], data["depot"])
+    routing = pywrapcp.RoutingModel(manager)
+
+    if data.get("neighbours"):
+
+        def distance_callback(f_idx, t_idx):
+            """Distance over a candidate arc; any other arc costs NON_CANDIDATE_ARC."""
+            return matrix[manager.IndexToNode(f_idx)].get(
+                manager.IndexToNode(t_idx), NON_CANDIDATE_ARC
+            )
+
+        transit_idx = routing.RegisterTransitCallback(distance_callback)
+    else:
+        transit_idx = routing.RegisterTransitMatrix(transit_matrix(matrix))
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_idx)
+
+    if len(set(costs)) > 1:
+        routing.AddDimension(transit_idx, 0, MAX_ROUTE_DISTANCE, True, "Distance")
+        distance = routing.GetDimensionOrDie("Distance")
+        for vehicle_id, cost in enumerate(costs):
+            distance.SetSpanCostCoefficientForVehicle(cost - 1, vehicle_id)
+
+    demand_idx = routing.RegisterUnaryTransitVector(data["demands"])
+    routing.AddDimensionWithVehicleCapacity(
+        demand_idx, 0, data["vehicle_capacities"], True, "Capacity"
+    )
+    return manager, routing
+
+
+def speed_cost(speed):
+    """Cost per metre travelled at an average speed in km/h: its travel time in ms, rounded."""
+    speed = float(speed)
+    if not speed > 0:
+        raise ValueError(f"ERROR: Vehicle average speed must be positive, got {speed}.")
+    return max(1, round(3600 / speed))
+
+
+def transit_matrix(distance_matrix):
+    """A dense distance matrix as the nested int lists OR-Tools registers.
+
+    Converted a row at a time so a mapped matrix is never copied whole.
+    """
+    return [np.asarray(row, dtype=np.int64).tolist() for row in distance_matrix]
+
+
+def candidate_ratio(data):
+    """Mean share of the nodes kept as candidate successors in a sparse model."""
+    n = len(data["neighbours"])
+    return min(1.0, sum(len(c) for c in data["neighbours"]) / n**2)
+
+
+def solve_routes(
+    data, strategy, time_limit=2, initial_routes=None, plateau=None, warm_time_limit=None
+):
+    """Solve routing data with one first-solution strategy.
+
+    time_limit is in seconds and may be fractional. With plateau set, the
+    search also stops once that many seconds pass without the objective
+    improving. With initial_routes (one list of order nodes per vehicle, depot
+    excluded) the search starts from that assignment and only runs a
+    greedy-descent polish, cut to warm_time_limit seconds, instead of a
+    guided local search, so a warm re-plan moves stops as little as
+    possible. A seed the model rejects falls back to the cold search with
+    its full time_limit. Returns one list of node indices per vehicle,
+    from depot back to depot, or None when no solution was found or a
+    sparse solution still takes a non-candidate arc, together with the
+    search statistics.
+    """
+    started = time.perf_counter()
+    manager, routing = build_routing_model(data)
+    model_seconds = time.perf_counter() - started
+
+    improvements = []
+    plateaued = False
+
+    def record_solution():
+        nonlocal plateaued
+        objective = routing.CostVar().Max()
+        elapsed = time.perf_counter() - started
+        if not improvements or objective < improvements[-1][1]:
+            improvements.append([round(elapsed, 4), objective])
+        elif plateau and elapsed - improvements[-1][0] > plateau:
+            plateaued = True
+            routing.solver().FinishCurrentSearch()
+
+    routing.AddAtSolutionCallback(record_solution)
+
+    search_params = pywrapcp.DefaultRoutingSearchParameters()
+    search_params.first_solution_strategy = strategy
+    search_params.local_search_metaheuristic = (
+        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    )
+    search_params.time_limit.FromMilliseconds(int(time_limit * 1000))
+    if data.get("neighbours"):
+        search_params.savings_parameters.neighbors_ratio = candidate_ratio(data)
+
+    initial = None
+    if initial_routes is not None:
+        routing.CloseModelWithParameters(search_params)
+        initial = routing.ReadAssignmentFromRoutes(
+            [[manager.NodeToIndex(node) for node in route] for route in initial_routes],
+            True,
+        )
+    if initial is not None:
+        search_params.local_search_metaheuristic = (
+            routing_enums_pb2.LocalSearchMetaheuristic.GREEDY_DESCENT
+        )
+        if warm_time_limit is not None and warm_time_limit < time_limit:
+            # The plateau window keeps its share of the shorter budget.
+            if plateau:
+                plateau *= warm_time_limit / time_limit
+            time_limit = warm_time_limit
+            search_params.time_limit.FromMilliseconds(int(time_limit * 1000))
+
+    search_started = time.perf_counter()
+    if initial is not None:
+        solution = routing.SolveFromAssignmentWithParameters(initial, search_params)
+    else:
+        solution = routing.SolveWithParameters(search_params)
+
+    search_seconds = time.perf_counter() - search_started
+    if not solution:
+        stop_reason = "no_solution"
+    elif plateaued:
+        stop_reason = "plateau"
+    elif search_seconds >= time_limit * 0.99:
+        stop_reason = "time_limit"
+    else:
+        stop_reason = "converged"
+    stats = {
+        "time_limit": round(time_limit, 4),
+        "model_seconds": round(model_seconds, 4),
+        "search_seconds": round(search_seconds, 4),
+        "solutions": routing.solver().Solutions(),
+        "objective": solution.ObjectiveValue() if solution else None,
+        "improvements": improvements,
+        "stop_reason": stop_reason,
+        "time_limit_hit": stop_reason == "time_limit",
+        "warm_start": initial is not None,
+    }
+    if not solution:
+        return None, stats
+
+    routes = []
+    for vehicle_id in range(data["num_vehicles"]):
+        index = routing.Start(vehicle_id)
+        route = []
+        while not routing.IsEnd(index):
+            route.append(manager.IndexToNode(index))
+            index = solution.Value(routing.NextVar(index))
+        route.append(manager.IndexToNode(index))
+        routes.append(route)
+    if data.get("neighbours") and uses_non_candidate_arc(data, routes):
+        stats["stop_reason"] = "non_candidate_arc"
+        return None, stats
+    return routes, stats
+
+
+def uses_non_candidate_arc(data, routes):
+    matrix = routing_matrix(data)
+    return any(b not in matrix[a] for route in routes for a, b in zip(route, route[1:]))
+
+
+def solver_pool(max_workers):
+    """Return the shared process pool used to solve variants concurrently.
+
+    Workers are spawned rather than forked so they never inherit the
+    parent's database connections or solver threads, and the pool is reused
+    across requests so the start-up cost is paid once per process.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def solve_many(tasks, parallel=False, max_workers=3):
+    """Solve tasks and return their (node routes, statistics) in task order.
+
+    Each task is the argument tuple of solve_routes, starting with the
+    routing data and the first-solution strategy.
+    """
+    global _pool
+    if not parallel:
+        return [solve_routes(*task) for task in tasks]
+
+    try:
+        futures = [
+            solver_pool(max_workers).submit(solve_routes, solver_data(task[0]), *task[1:])
+            for task in tasks
+        ]
+        results = []
+        for task, future in zip(tasks, futures):
+            try:
+                results.append(future.result())
+            except FileNotFoundError:
+                # The matrix file was evicted before the worker mapped it,
+                # but this process still holds the matrix, so solve here.
+                results.append(solve_routes(*task))
+        return results
+    except BrokenProcessPool:
+        _pool = None
+        return [solve_routes(*task) for task in tasks]
+
+
+def solve_variants(data, strategies, time_limit=2, parallel=False, max_workers=3):
+    """Solve every strategy and return (node routes, statistics) in strategy order."""
+    return solve_many(
+        [(data, strategy, time_limit) for strategy in strategies], parallel, max_workers
+    )
@@ -0,0 +1,86 @@
+from django.db.models import Case, Count, F, Sum, Value, When
+from delivery_app.models import DailyDeliveryStats, Delivery, Order
+
+
+def stats_row(delivery):
+    """Return the stats row of a delivery, creating it from the delivery if missing."""
+    stats, _ = DailyDeliveryStats.objects.get_or_create(
+        delivery=delivery,
+        defaults={
+            "store_id": delivery.store_id,
+            "date": delivery.date_of_delivery,
+            "vehicle_count": delivery.vehicles.count(),
+        },
+    )
+    return stats
+
+
+def record_orders_added(delivery, orders):
+    """Add a batch of orders to their delivery's stats with in-database increments.
+
+    A stored plan no longer covers the delivery, so it is marked stale.
+    """
+    stats = stats_row(delivery)
+    DailyDeliveryStats.objects.filter(id=stats.id).update(
+        order_count=F("order_count") + len(orders),
+        total_weight=F("total_weight") + sum(o.weight for o in orders),
+        plan_status=Case(
+            When(plan_status=DailyDeliveryStats.PLANNED, then=Value(DailyDeliveryStats.STALE)),
+            default=F("plan_status"),
+        ),
+    )
+
+
+def record_plan(delivery, variants):
+    """Store the distance of the best of freshly saved route variants."""
+    stats = stats_row(delivery)
+    DailyDeliveryStats.objects.filter(id=stats.id).update(
+        planned_distance=min(v["total_distance"] for v in variants),
+        plan_status=DailyDeliveryStats.PLANNED,
+    )
+
+
+def refresh_delivery_stats(delivery_id, mark_stale=True):
+    """Recompute one delivery's counts from its orders and vehicles.
+
+    Used where an increment cannot be derived, such as edited or deleted
+    orders and changed vehicle sets.
+    """
+    delivery = Delivery.objects.filter(id=delivery_id).first()
+    if delivery is None:
+        return
+    orders = Order.objects.filter(delivery_id=delivery_id).aggregate(
+        count=Count("id"), weight=Sum("weight")
+    )
+    stats = stats_row(delivery)
+    DailyDeliveryStats.objects.filter(id=stats.id).update(
+        order_count=orders["count"],
+        total_weight=orders["weight"] or 0,
+        vehicle_count=delivery.vehicles.count(),
+    )
+    if mark_stale:
+        DailyDeliveryStats.objects.filter(
+            id=stats.id, plan_status=DailyDeliveryStats.PLANNED
+        ).update(plan_status=DailyDeliveryStats.STALE)
+
+
+def stats_in_range(start=None, end=None, store=None):
+    """Stats rows between two dates inclusive, optionally for one store."""
+    rows = DailyDeliveryStats.objects.select_related("store")
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    if store is not None:
+        rows = rows.filter(store_id=store)
+    return rows
+
+
+def available_dates(start=None, end=None, store=None):
+    """Distinct delivery dates, read from the date index of the stats table."""
+    return (
+        stats_in_range(start, end, store)
+        .order_by("date")
+        .values_list("date", flat=True)
+        .distinct()
+    )
@@ -0,0 +1,54 @@
+import time
+import threading
+import numpy as np
+from django.conf import settings
+from delivery_app.models import Store
+from delivery_app.utils import point_coordinates, unit_vectors
+
+
+class StoreIndex:
+    """Cached in-memory nearest-store lookup.
+
+    Store coordinates are kept as unit vectors, where the largest dot
+    product is the smallest great-circle distance, so a batch of lookups
+    is one matrix product. The index is rebuilt lazily after a store or
+    location changes, and at least every STORE_INDEX_TTL seconds so other
+    processes pick up changes too.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._stores = None
+        self._vectors = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self):
+        with self._lock:
+            if self._stores is None or time.monotonic() - self._loaded_at > self.ttl:
+                stores = list(Store.objects.select_related("location"))
+                coords = point_coordinates([store.location.point for store in stores])
+                self._stores, self._vectors = stores, unit_vectors(coords)
+                self._loaded_at = time.monotonic()
+            return self._stores, self._vectors
+
+    def stores(self):
+        return self._index()[0]
+
+    def nearest_many(self, coords):
+        """Return the nearest store for each (lon, lat) row, or None without stores."""
+        stores, vectors = self._index()
+        if not stores:
+            return [None] * len(coords)
+        nearest = (unit_vectors(np.asarray(coords, dtype=np.float64)) @ vectors.T).argmax(axis=1)
+        return [stores[i] for i in nearest]
+
+    def nearest(self, point):
+        return self.nearest_many(point_coordinates([point]))[0]
+
+    def invalidate(self):
+        with self._lock:
+            self._stores = self._vectors = None
+
+
+store_index = StoreIndex(settings.STORE_INDEX_TTL)
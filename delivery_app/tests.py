@@ -1,3 +1,303 @@
-from django.test import TestCase
+import random
+import numpy as np
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase, override_settings
+from ortools.constraint_solver import routing_enums_pb2
+from delivery_app.benchmark import run_benchmark, scaling_series
+from delivery_app.clustering import split_vehicles, sweep_partition
+from delivery_app.ingest import import_orders
+from delivery_app.locations import resolve_locations, snap_points
+from delivery_app.models import Location, Order, Store
+from delivery_app.solver import STRATEGIES, solve_routes, speed_cost, transit_matrix
+from delivery_app.utils import (
+    expand_routes,
+    group_stops,
+    haversine_distance,
+    haversine_matrix,
+    partition_instance,
+    point_coordinates,
+    strategy_label,
+    warm_start_routes,
+)
+from delivery_app.wire import encode_polyline
 
-# Create your tests here.
+
+def order(i, lon, lat, weight):
+    location = SimpleNamespace(id=i, point=Point(lon, lat, srid=4326))
+    return SimpleNamespace(id=i, order_id=f"O{i}", weight=weight, delivery_location=location)
+
+
+def vehicle(i, capacity, speed=30):
+    return SimpleNamespace(id=i, vehicle_no=f"V{i}", capacity=capacity, average_speed=speed)
+
+
+class HaversineTests(SimpleTestCase):
+    def test_matrix_matches_scalar_distance(self):
+        rng = random.Random(0)
+        points = [
+            Point(73.7 + rng.random() * 0.3, 19.9 + rng.random() * 0.3, srid=4326)
+            for _ in range(30)
+        ]
+        coords = point_coordinates(points)
+        matrix = haversine_matrix(coords, coords, block_size=7)
+        expected = [[int(haversine_distance(a, b) * 1000) for b in points] for a in points]
+        np.testing.assert_array_equal(matrix, expected)
+
+
+class PolylineTests(SimpleTestCase):
+    def test_encodes_reference_polyline(self):
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(encode_polyline(points), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    def test_empty_polyline(self):
+        self.assertEqual(encode_polyline([]), "")
+
+
+class ClusteringTests(SimpleTestCase):
+    def test_split_vehicles_balances_capacity(self):
+        self.assertEqual(split_vehicles([100, 100, 100], 2), [[0, 2], [1]])
+        self.assertEqual(split_vehicles([300, 100, 100, 100], 2), [[0], [1, 2, 3]])
+
+    def test_sweep_partition_cuts_at_capacity(self):
+        coords = [(1, i) for i in range(10)]
+        clusters = sweep_partition((0, 0), coords, [29] * 10, [200, 100])
+        self.assertEqual(sorted(i for c in clusters for i in c), list(range(10)))
+        self.assertEqual([29 * len(c) for c in clusters], [174, 116])
+
+    def test_sweep_partition_keeps_sectors_contiguous(self):
+        coords = [(1, 1), (-1, 1), (-1, -1), (1, -1)] * 3
+        clusters = sweep_partition((0, 0), coords, [1] * 12, [10, 10])
+        for cluster in clusters:
+            self.assertEqual(len({coords[i] for i in cluster}), 2)
+
+    @override_settings(ROUTING_CLUSTER_SIZE=5)
+    def test_partition_instance_fits_every_fleet(self):
+        store = SimpleNamespace(location=SimpleNamespace(point=Point(0, 0, srid=4326)))
+        orders = [order(i, 0.01 * (i % 5 - 2), 0.01 * (i // 5 - 2), 10) for i in range(20)]
+        vehicles = [vehicle(i, 60) for i in range(4)]
+        parts = partition_instance(store, orders, vehicles)
+        self.assertEqual(sum(len(o) for o, _ in parts), 20)
+        self.assertEqual(sorted(v.id for _, vs in parts for v in vs), [0, 1, 2, 3])
+        for part_orders, part_vehicles in parts:
+            self.assertLessEqual(
+                sum(o.weight for o in part_orders), sum(v.capacity for v in part_vehicles)
+            )
+
+    @override_settings(ROUTING_CLUSTER_SIZE=5)
+    def test_partition_instance_rejects_infeasible_split(self):
+        store = SimpleNamespace(location=SimpleNamespace(point=Point(0, 0, srid=4326)))
+        orders = [order(i, 1, 0.1 * i, 29) for i in range(10)]
+        vehicles = [vehicle(i, 100) for i in range(3)]
+        self.assertIsNone(partition_instance(store, orders, vehicles))
+
+
+class StopTests(SimpleTestCase):
+    def test_group_stops_merges_identical_points(self):
+        orders = [order(0, 1, 1, 5), order(1, 2, 2, 5), order(2, 1, 1, 5)]
+        self.assertEqual(group_stops(orders, 100), [[0, 2], [1]])
+
+    def test_group_stops_splits_at_capacity(self):
+        orders = [order(i, 1, 1, 40) for i in range(3)] + [order(3, 2, 2, 10)]
+        self.assertEqual(group_stops(orders, 100), [[0, 1], [2], [3]])
+
+    def test_expand_routes_lists_every_order(self):
+        data = {"stops": [[0, 2], [1], [3]]}
+        self.assertEqual(
+            expand_routes(data, [[0, 2, 1, 0], [0, 3, 0], [0, 0]]),
+            [[0, 2, 1, 3, 0], [0, 4, 0], [0, 0]],
+        )
+        self.assertIsNone(expand_routes(data, None))
+
+
+class WarmStartTests(SimpleTestCase):
+    def setUp(self):
+        # Depot at the origin, orders at these (x, y) km offsets.
+        positions = np.array([(0, 0), (1, 0), (2, 0), (-1, 0), (2, 1)])
+        distances = np.linalg.norm(positions[:, None] - positions[None, :], axis=2)
+        self.data = {
+            "distance_matrix": np.round(distances * 1000).astype(int).tolist(),
+            "demands": [0, 1, 1, 1, 1],
+            "vehicle_capacities": [10, 10],
+            "stop_of": [0, 1, 2, 3, 4],
+        }
+        self.orders = [SimpleNamespace(order_id=f"O{i}") for i in range(1, 5)]
+        self.vehicles = [vehicle(0, 10), vehicle(1, 10)]
+
+    def stored(self, vehicle_no, order_ids):
+        stops = [{"location": "Warehouse"}] + [{"location": o} for o in order_ids]
+        return {"vehicle_no": vehicle_no, "route": stops + [{"location": "Warehouse"}]}
+
+    def test_keeps_stored_stops_and_inserts_new_orders(self):
+        previous = [self.stored("V0", ["O1", "O2", "O9"]), self.stored("V1", ["O3"])]
+        routes = warm_start_routes(previous, self.data, self.orders, self.vehicles)
+        self.assertEqual(routes, [[1, 2, 4], [3]])
+
+    def test_frees_stops_that_no_longer_fit(self):
+        self.data["vehicle_capacities"] = [1, 10]
+        previous = [self.stored("V0", ["O1", "O2"]), self.stored("V1", ["O3"])]
+        routes = warm_start_routes(previous, self.data, self.orders, self.vehicles)
+        self.assertEqual(routes[0], [1])
+        self.assertEqual(sorted(routes[1]), [2, 3, 4])
+
+    def test_nothing_carried_over(self):
+        previous = [self.stored("V7", ["O1"])]
+        self.assertIsNone(warm_start_routes(previous, self.data, self.orders, self.vehicles))
+
+
+@mock.patch("delivery_app.locations.nearby_locations")
+class SnapTests(SimpleTestCase):
+    def test_snaps_to_nearest_order_location(self, nearby):
+        nearby.return_value = [SimpleNamespace(point=Point(73.79, 19.99, srid=4326))]
+        snapped = snap_points([Point(73.79005, 19.99005, srid=4326)], tolerance=15)
+        self.assertEqual(snapped[0].coords, (73.79, 19.99))
+
+    def test_groups_close_points_of_a_batch(self, nearby):
+        nearby.return_value = []
+        points = [
+            Point(73.79, 19.99, srid=4326),
+            Point(74.0, 20.0, srid=4326),
+            Point(73.79005, 19.99005, srid=4326),
+        ]
+        snapped = snap_points(points, tolerance=15)
+        self.assertEqual(
+            [p.coords for p in snapped], [(73.79, 19.99), (74.0, 20.0), (73.79, 19.99)]
+        )
+
+    def test_resolve_locations_keeps_each_address(self, nearby):
+        nearby.return_value = [SimpleNamespace(point=Point(73.79, 19.99, srid=4326))]
+        rows = [
+            ("Flat 1", Point(73.79005, 19.99005, srid=4326)),
+            ("Flat 2", Point(73.79, 19.99, srid=4326)),
+            ("Far away", Point(74.0, 20.0, srid=4326)),
+        ]
+        with mock.patch.object(Location.objects, "bulk_create", side_effect=lambda objs: objs):
+            locations = resolve_locations(rows, tolerance=15)
+        self.assertEqual([loc.address for loc in locations], ["Flat 1", "Flat 2", "Far away"])
+        self.assertEqual(
+            [loc.point.coords for loc in locations],
+            [(73.79, 19.99), (73.79, 19.99), (74.0, 20.0)],
+        )
+
+    def test_zero_tolerance_keeps_points(self, nearby):
+        points = [Point(73.79, 19.99, srid=4326), Point(73.79005, 19.99005, srid=4326)]
+        self.assertEqual(snap_points(points, tolerance=0), points)
+        nearby.assert_not_called()
+
+
+class StrategyLabelTests(SimpleTestCase):
+    def test_labels_strategies_by_name(self):
+        savings = routing_enums_pb2.FirstSolutionStrategy.SAVINGS
+        self.assertEqual(strategy_label(savings), "SAVINGS")
+        self.assertEqual(strategy_label(999), "999")
+
+
+class OrderCreateTests(TestCase):
+    def setUp(self):
+        depot = Location.objects.create(address="Depot", point=Point(73.79, 19.99, srid=4326))
+        Store.objects.create(name="Depot", location=depot)
+
+    def test_repeated_post_leaves_one_location(self):
+        payload = {
+            "order_id": "O1",
+            "weight": 5,
+            "date_of_order": "2024-01-01",
+            "delivery_location": {"address": "Flat 1", "point": "SRID=4326;POINT (73.8 20.0)"},
+        }
+        first = self.client.post("/api/orders/", payload, content_type="application/json")
+        second = self.client.post("/api/orders/", payload, content_type="application/json")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(Location.objects.filter(address="Flat 1").count(), 1)
+        self.assertEqual(Order.objects.get(order_id="O1").delivery_location.address, "Flat 1")
+
+
+class ImportOrdersTests(TestCase):
+    def setUp(self):
+        depot = Location.objects.create(address="Depot", point=Point(73.79, 19.99, srid=4326))
+        Store.objects.create(name="Depot", location=depot)
+
+    def row(self, order_id):
+        return {
+            "order_id": order_id,
+            "weight": "5",
+            "date_of_order": "2024-01-01",
+            "address": f"Flat {order_id}",
+            "latitude": "20.0",
+            "longitude": "73.8",
+        }
+
+    def test_duplicate_order_ids_become_row_errors(self):
+        report = import_orders([self.row("O1"), self.row("O1"), self.row("O2")])
+        self.assertEqual(report["created"], 2)
+        self.assertEqual([e["row"] for e in report["errors"]], [2])
+
+        again = import_orders([self.row("O2")])
+        self.assertEqual(again["created"], 0)
+        self.assertEqual([e["row"] for e in again["errors"]], [1])
+        self.assertEqual(Order.objects.filter(delivery__isnull=False).count(), 2)
+
+
+class BenchmarkTests(TestCase):
+    @mock.patch("delivery_app.utils.matrix_store")
+    def test_run_benchmark_leaves_no_rows(self, matrix_store):
+        run = run_benchmark(12, 2, time_limit=0.1)
+        self.assertEqual(matrix_store.mock_calls, [])
+        self.assertEqual(set(run["cost_km"]), {strategy_label(s) for s in STRATEGIES})
+        self.assertIsNotNone(run["best_strategy"])
+        self.assertIn("db_write", run["phases"])
+        self.assertFalse(Order.objects.filter(order_id__startswith="BENCH-").exists())
+
+    def test_run_benchmark_compares_sparse_model(self):
+        run = run_benchmark(30, 3, time_limit=0.2, write_db=False, neighbours=5)
+        sparse = run["sparse"]
+        self.assertEqual(set(sparse["cost_km"]), set(run["cost_km"]))
+        self.assertEqual(
+            sparse["dense_fallbacks"], sum(km is None for km in sparse["cost_km"].values())
+        )
+        self.assertLessEqual(set(sparse["gap_pct"]), set(sparse["cost_km"]))
+
+    def test_scaling_series_fits_exponent(self):
+        runs = [
+            {
+                "n_orders": n,
+                "n_vehicles": 5,
+                "tightness": 0.8,
+                "spread_km": 10,
+                "phases": {"routing_data": n**2 / 1e4, "solve:SAVINGS": n**2 / 1e4},
+                "peak_python_mb": 1.0,
+            }
+            for n in (50, 100, 200)
+        ]
+        (series,) = scaling_series(runs)
+        self.assertEqual([p["n_orders"] for p in series["points"]], [50, 100, 200])
+        self.assertAlmostEqual(series["points"][0]["solve_seconds"], 0.25)
+        self.assertAlmostEqual(series["exponent"], 2.0)
+
+
+class SpeedTests(SimpleTestCase):
+    def test_speed_cost_accepts_decimal_speed(self):
+        self.assertEqual(speed_cost(Decimal("30")), 120)
+        self.assertEqual(speed_cost(30.0), speed_cost(Decimal("30")))
+        self.assertEqual(transit_matrix(np.array([[0, 1000], [1000, 0]])), [[0, 1000], [1000, 0]])
+
+    def test_non_positive_speed_is_rejected(self):
+        for speed in (0, -5):
+            with self.assertRaises(ValueError):
+                speed_cost(speed)
+
+    def test_mixed_speeds_cost_each_vehicle_its_own_time(self):
+        data = {
+            "distance_matrix": [[0, 1000, 1000], [1000, 0, 1000], [1000, 1000, 0]],
+            "matrix_path": None,
+            "num_vehicles": 2,
+            "depot": 0,
+            "vehicle_capacities": [10, 10],
+            "vehicle_speeds": [30, 60],
+            "demands": [0, 1, 1],
+        }
+        routes, stats = solve_routes(data, STRATEGIES[0], time_limit=0.5)
+        self.assertEqual(routes[0], [0, 0])
+        self.assertEqual(stats["objective"], 3000 * speed_cost(60))
@@ -1,8 +1,22 @@
-from datetime import date
-from ortools.constraint_solver import routing_enums_pb2, pywrapcp
+import time
+import logging
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from ortools.constraint_solver import routing_enums_pb2
 from django.contrib.gis.geos import Point
 from math import radians, sin, cos, sqrt, atan2
-from delivery_app.models import Delivery, Vehicle, Store, Order
+from delivery_app.models import Delivery, Vehicle, Order
+from delivery_app.distance_cache import distance_cache, location_keys
+from delivery_app.matrix_store import matrix_key, matrix_store
+from delivery_app.metrics import SolveTrace
+from delivery_app.solver import STRATEGIES, solve_many
+from delivery_app.stats import record_orders_added
+from delivery_app.clustering import split_vehicles, sweep_partition
+
+logger = logging.getLogger(__name__)
 
 
 def haversine_distance(p1, p2):
@@ -14,33 +28,304 @@ def haversine_distance(p1, p2):
     return R * 2 * atan2(sqrt(a), sqrt(1 - a))
 
 
-def routing_data(store, orders, vehicles):
-    """Prepare routing data for the OR-Tools solver."""
+def point_coordinates(points):
+    """Read (lon, lat) pairs out of GEOS points into an (n, 2) float array."""
+    return np.array([p.coords for p in points], dtype=np.float64).reshape(-1, 2)
+
+
+def haversine_matrix(origins, destinations, block_size=512):
+    """Vectorized haversine_distance between two coordinate arrays, in whole metres.
+
+    Follows the scalar formula operation for operation so every entry matches
+    int(haversine_distance(p1, p2) * 1000). Rows are processed in blocks to
+    keep the float temporaries bounded for large instances.
+    """
+    R = 6371.0
+    lon1, lat1 = np.radians(origins[:, 0]), np.radians(origins[:, 1])
+    lon2, lat2 = np.radians(destinations[:, 0]), np.radians(destinations[:, 1])
+    cos_lat1, cos_lat2 = np.cos(lat1), np.cos(lat2)
+
+    matrix = np.empty((len(origins), len(destinations)), dtype=np.int32)
+    for start in range(0, len(origins), block_size):
+        rows = slice(start, start + block_size)
+        dlon = lon2[np.newaxis, :] - lon1[rows, np.newaxis]
+        dlat = lat2[np.newaxis, :] - lat1[rows, np.newaxis]
+        a = (
+            np.sin(dlat / 2) ** 2
+            + cos_lat1[rows, np.newaxis] * cos_lat2[np.newaxis, :] * np.sin(dlon / 2) ** 2
+        )
+        matrix[rows] = R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * 1000
+    return matrix
+
+
+def haversine_pairs(origins, destinations):
+    """Element-wise haversine_distance between matching rows, in whole metres."""
+    R = 6371.0
+    lon1, lat1 = np.radians(origins[:, 0]), np.radians(origins[:, 1])
+    lon2, lat2 = np.radians(destinations[:, 0]), np.radians(destinations[:, 1])
+    dlon, dlat = lon2 - lon1, lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return (R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * 1000).astype(np.int32)
+
+
+def unit_vectors(coords):
+    """Map (lon, lat) degrees onto points of the unit sphere."""
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+
+
+def nearest_neighbours(coords, k, block_size=1024):
+    """Indices of the k nearest other points of every point.
+
+    Nearest by chord length on the unit sphere is nearest by great-circle
+    distance, so each block of rows is one matrix product and an
+    argpartition, keeping memory linear in the number of points.
+    """
+    vectors = unit_vectors(coords)
+    n = len(vectors)
+    k = min(k, n - 1)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        similarity = vectors[rows] @ vectors.T
+        similarity[rows - start, rows] = -np.inf
+        neighbours[rows] = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    return neighbours
+
+
+def sparse_distance_matrix(points, k, network=None):
+    """Candidate-arc distances: each node's k nearest neighbours plus the depot arcs.
+
+    Returns one {node: metres} dict per node, with node 0 as the depot, and
+    the list of allowed successors of every node. Neighbours are always
+    picked by straight-line distance; with a road network only the
+    candidate arcs are then weighted by road distance.
+    """
+    coords = point_coordinates(points)
+    n = len(coords)
+    nearest = nearest_neighbours(coords, k)
+    reverse = [[] for _ in range(n)]
+    for i, row in enumerate(nearest.tolist()):
+        for j in row:
+            reverse[j].append(i)
+
+    candidates = [np.arange(n)]
+    for i in range(1, n):
+        candidates.append(np.union1d(nearest[i], reverse[i] + [0, i]))
+
+    origins = np.concatenate([np.full(len(c), i) for i, c in enumerate(candidates)])
+    destinations = np.concatenate(candidates)
+    if network is None:
+        distances = haversine_pairs(coords[origins], coords[destinations])
+    else:
+        distances = network.travel_pairs(coords, origins, destinations)
+
+    matrix = [{} for _ in range(n)]
+    for origin, destination, distance in zip(
+        origins.tolist(), destinations.tolist(), distances.tolist()
+    ):
+        matrix[origin][destination] = distance
+    if network is None:
+        for i in range(1, n):
+            matrix[i][0] = matrix[0][i]
+    return matrix, [c.tolist() for c in candidates]
+
+
+def distance_matrix(points):
+    """Build the symmetric int32 distance matrix in metres for a list of points."""
+    coords = point_coordinates(points)
+    return haversine_matrix(coords, coords)
+
+
+def _missing_cover(known):
+    """Greedily pick node indices whose rows cover every unknown pair."""
+    missing = ~known
+    counts = missing.sum(axis=1)
+    cover = []
+    while len(counts) and counts.max() > 0:
+        i = int(counts.argmax())
+        cover.append(i)
+        counts -= missing[:, i]
+        counts[i] = 0
+        missing[i, :] = missing[:, i] = False
+    return cover
+
+
+def cached_distance_matrix(places):
+    """Distance matrix for Location objects, computing only pairs missing from the cache.
+
+    Rows that are already known come from the distance cache, so a delivery
+    that grew by k orders only computes and stores O(n*k) new pairs.
+    """
+    ids = [place.id for place in places]
+    points = [place.point for place in places]
+    if None in ids:
+        return distance_matrix(points)
+
+    coords = point_coordinates(points)
+    keys = location_keys(ids, coords)
+    matrix, known = distance_cache.lookup(keys)
+    if known.all():
+        return matrix
+
+    fetched = _missing_cover(known)
+    distance_cache.fetch(ids, fetched, matrix, known)
+
+    computed = _missing_cover(known)
+    if computed:
+        rows = haversine_matrix(coords[computed], coords)
+        matrix[computed] = rows
+        matrix[:, computed] = rows.T
+
+    distance_cache.store(keys, matrix, sorted(set(fetched) | set(computed)))
+    distance_cache.persist(ids, matrix, computed)
+    return matrix
+
+
+def dense_travel_matrix(places, network=None, stored=True):
+    """Dense int32 travel matrix in metres for Location objects, and its file if stored.
+
+    With ROUTING_MATRIX_DIR set the matrix is kept in the matrix store,
+    keyed by the coordinates and metric, so a re-plan over the same stops
+    maps the stored file instead of rebuilding it. stored=False always
+    computes the matrix and leaves the store untouched.
+    """
+    coords = point_coordinates([place.point for place in places])
+    if matrix_store is None or not stored:
+        return compute_travel_matrix(places, coords, network), None
+
+    key = matrix_key(coords, network.path if network else "haversine")
+    matrix = matrix_store.get(key)
+    if matrix is None:
+        matrix = matrix_store.put(key, compute_travel_matrix(places, coords, network))
+    return np.asarray(matrix), matrix_store.path(key)
+
+
+def compute_travel_matrix(places, coords, network=None):
+    if network is None:
+        return cached_distance_matrix(places)
+    return network.travel_matrix(coords)
+
+
+def road_network_for(store):
+    """The road network configured for a store, or None to route on haversine distances."""
+    # Imported here because road_network builds on the geometry helpers above.
+    from delivery_app.road_network import road_networks
+
+    return road_networks.for_store(store)
+
+
+def group_stops(orders, max_capacity):
+    """Group the indices of orders sharing a delivery point into routing stops.
+
+    Orders at identical coordinates become one stop, split into several
+    where their summed weight would exceed max_capacity. Stops keep the
+    order of their first order.
+    """
+    groups = {}
+    for i, order in enumerate(orders):
+        groups.setdefault(order.delivery_location.point.coords, []).append(i)
+
+    stops = []
+    for members in groups.values():
+        stop, load = [], 0
+        for i in members:
+            weight = int(orders[i].weight)
+            if stop and load + weight > max_capacity:
+                stops.append(stop)
+                stop, load = [], 0
+            stop.append(i)
+            load += weight
+        stops.append(stop)
+    return stops
+
+
+def expand_routes(data, node_routes):
+    """Turn solver routes over stop nodes into routes over order nodes.
+
+    Order nodes number orders from 1 as before collapsing, so order i is
+    node i + 1, and the orders of one stop are delivered back to back.
+    """
+    if node_routes is None:
+        return None
+    return [
+        [0] + [i + 1 for node in route[1:-1] for i in data["stops"][node - 1]] + [0]
+        for route in node_routes
+    ]
+
+
+def routing_data(store, orders, vehicles, neighbours=None, stored=True):
+    """Prepare routing data for the OR-Tools solver.
+
+    Orders sharing a delivery point are collapsed into one node whose
+    demand is their summed weight; stops lists the orders of each node
+    after the depot and stop_of maps order nodes back to stop nodes.
+    With neighbours set, the matrix only holds candidate arcs to each
+    stop's nearest neighbours and the depot, and the solver penalizes the
+    rest; otherwise it is a dense int32 array, mapped from matrix_path when
+    the matrix store is enabled and stored is set. Stores with a road
+    network in ROUTING_ROAD_NETWORKS are routed on road distances, which
+    may differ by direction; others on haversine distances.
+    """
     if not orders or not vehicles:
         raise ValueError("ERROR: Orders or vehicles cannot be empty.")
     if not isinstance(store.location.point, Point):
         raise ValueError("ERROR: Store location must be a valid Point object.")
 
-    locations = [store.location.point] + [o.delivery_location.point for o in orders]
-    distance_matrix = [
-        [int(haversine_distance(loc1, loc2) * 1000) for loc2 in locations]
-        for loc1 in locations
-    ]
     vehicle_capacities = [int(v.capacity) for v in vehicles]
-    demands = [0] + [int(o.weight) for o in orders]
+    vehicle_speeds = [v.average_speed for v in vehicles]
+    stops = group_stops(orders, max(vehicle_capacities))
+    stop_of = [0] * (len(orders) + 1)
+    for node, stop in enumerate(stops, start=1):
+        for i in stop:
+            stop_of[i + 1] = node
+
+    places = [store.location] + [orders[stop[0]].delivery_location for stop in stops]
+    locations = [place.point for place in places]
+    demands = [0] + [sum(int(orders[i].weight) for i in stop) for stop in stops]
+
+    network = road_network_for(store)
+    matrix_path = None
+    if neighbours and len(places) > neighbours + 1:
+        matrix, candidates = sparse_distance_matrix(locations, neighbours, network)
+    else:
+        (matrix, matrix_path), candidates = dense_travel_matrix(places, network, stored), None
 
     return {
-        "distance_matrix": distance_matrix,
+        "distance_matrix": matrix,
+        "matrix_path": matrix_path,
+        "neighbours": candidates,
         "num_vehicles": len(vehicles),
         "depot": 0,
         "vehicle_capacities": vehicle_capacities,
+        "vehicle_speeds": vehicle_speeds,
         "demands": demands,
         "locations": locations,
+        "stops": stops,
+        "stop_of": stop_of,
     }
 
 
-def assign_routes_to_delivery(store, orders, vehicles, delivery_date, num_variants=3):
-    """Assign routes and showcase route variants for a delivery date."""
+def assign_routes_to_delivery(
+    store,
+    orders,
+    vehicles,
+    delivery_date,
+    num_variants=3,
+    previous_routes=None,
+    trace=None,
+    deadline=None,
+):
+    """Assign routes and showcase route variants for a delivery date.
+
+    previous_routes maps a strategy name to the vehicle routes of an
+    earlier plan and warm-starts that strategy from them. Phase timings
+    and solver statistics are recorded on trace when one is given, and
+    deadline caps the solve at that many seconds.
+    """
+    trace = trace or SolveTrace()
     if not vehicles:
         raise ValueError("ERROR: No vehicles available for routing.")
     if not orders:
@@ -56,91 +341,341 @@ def assign_routes_to_delivery(store, orders, vehicles, delivery_date, num_varian
         defaults={"total_weight": delivery_weight},
     )
 
-    data = routing_data(store, orders, vehicles)
-    manager = pywrapcp.RoutingIndexManager(
-        len(data["distance_matrix"]), data["num_vehicles"], data["depot"]
+    variants, variant_routes = solve_route_variants(
+        store,
+        orders,
+        vehicles,
+        num_variants,
+        previous_routes=previous_routes,
+        trace=trace,
+        deadline=deadline,
     )
-    routing = pywrapcp.RoutingModel(manager)
-
-    def time_callback(f_idx, t_idx):
-        """Time callback function to calculate travel time."""
-        return int(
-            data["distance_matrix"][manager.IndexToNode(f_idx)][
-                manager.IndexToNode(t_idx)
-            ]
-            / max(v.average_speed for v in vehicles)
-            * 3600
-        )
 
-    transit_idx = routing.RegisterTransitCallback(time_callback)
-    routing.SetArcCostEvaluatorOfAllVehicles(transit_idx)
+    best = min(range(len(variants)), key=lambda i: variants[i]["total_distance"])
+    with trace.phase("db_write"):
+        save_route_assignments(delivery, variant_routes[best])
 
-    def demand_callback(idx):
-        return data["demands"][manager.IndexToNode(idx)]
+    return variants
 
-    demand_idx = routing.RegisterUnaryTransitCallback(demand_callback)
-    routing.AddDimensionWithVehicleCapacity(
-        demand_idx, 0, data["vehicle_capacities"], True, "Capacity"
-    )
 
-    variants = []
-    strategies = [
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC,
-        routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION,
-        routing_enums_pb2.FirstSolutionStrategy.SAVINGS,
-    ]
-    search_params = pywrapcp.DefaultRoutingSearchParameters()
-    search_params.local_search_metaheuristic = (
-        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-    )
-    search_params.time_limit.seconds = 2
+def solve_route_variants(
+    store,
+    orders,
+    vehicles,
+    num_variants=3,
+    neighbours=None,
+    previous_routes=None,
+    trace=None,
+    deadline=None,
+    decompose=True,
+):
+    """Solve the route variants of orders and vehicles without touching the database.
+
+    Returns the variants together with, per variant, the (vehicle_routes,
+    vehicles, orders) node routes of every sub-problem it was stitched from.
+    neighbours switches on the sparse k-nearest-neighbour model and defaults
+    to ROUTING_SPARSE_NEIGHBOURS; pass 0 to force the dense model.
+    Strategies found in previous_routes are seeded with those stored routes
+    and only polished for ROUTING_WARM_START_TIME_LIMIT seconds.
+
+    Every strategy gets a search budget sized to its sub-problem, shared
+    out so the whole solve fits in deadline seconds when one is given,
+    and stops early once its objective plateaus. When no strategy solves
+    every sub-problem of a split delivery, it is solved again whole.
+    """
+    trace = trace or SolveTrace()
+    deadline_at = time.monotonic() + deadline if deadline else None
+    if neighbours is None:
+        neighbours = settings.ROUTING_SPARSE_NEIGHBOURS
+    strategies = STRATEGIES[:num_variants]
+    with trace.phase("partition"):
+        parts = None
+        if (
+            decompose
+            and len(orders) > settings.ROUTING_DECOMPOSE_THRESHOLD
+            and len(vehicles) > 1
+        ):
+            parts = partition_instance(store, orders, vehicles)
+        parts = parts or [(orders, vehicles)]
+
+    with trace.phase("matrix"):
+        subproblems = [
+            (
+                routing_data(store, part_orders, part_vehicles, neighbours),
+                part_orders,
+                part_vehicles,
+            )
+            for part_orders, part_vehicles in parts
+        ]
+    tasks = [(k, p) for k in range(len(strategies)) for p in range(len(subproblems))]
+    task_data = {(k, p): subproblems[p][0] for k, p in tasks}
+
+    warm = {}
+    for k, p in tasks:
+        previous = (previous_routes or {}).get(strategy_label(strategies[k]))
+        if previous and not task_data[k, p]["neighbours"]:
+            initial = warm_start_routes(previous, task_data[k, p], *subproblems[p][1:])
+            if initial is not None:
+                warm[k, p] = initial
+
+    solver_stats = {}
+
+    def solve(keys):
+        available = None
+        if deadline_at is not None:
+            workers = settings.ROUTING_POOL_WORKERS if settings.ROUTING_PARALLEL_VARIANTS else 1
+            rounds = -(-len(keys) // workers)
+            available = (deadline_at - time.monotonic()) / rounds
+
+        batch = []
+        for k, p in keys:
+            time_limit = solve_time_budget(len(subproblems[p][1]), available)
+            batch.append(
+                (
+                    task_data[k, p],
+                    strategies[k],
+                    time_limit,
+                    warm.get((k, p)),
+                    time_limit * settings.ROUTING_PLATEAU_WINDOW,
+                    settings.ROUTING_WARM_START_TIME_LIMIT,
+                )
+            )
 
-    for i in range(min(num_variants, len(strategies))):
-        search_params.first_solution_strategy = strategies[i]
-        solution = routing.SolveWithParameters(search_params)
+        with trace.phase("solve"):
+            results = solve_many(
+                batch,
+                parallel=settings.ROUTING_PARALLEL_VARIANTS,
+                max_workers=settings.ROUTING_POOL_WORKERS,
+            )
+        for (k, p), (_, stats) in zip(keys, results):
+            solver_stats[k, p] = stats
+            trace.add_solver_stats(strategy_label(strategies[k]), stats)
+        return [
+            expand_routes(task_data[key], node_routes)
+            for key, (node_routes, _) in zip(keys, results)
+        ]
 
-        if solution:
-            variant = assign_vehicles_and_extract_routes(
-                data, manager, routing, solution, vehicles, orders, delivery, store
+    routes = dict(zip(tasks, solve(tasks)))
+
+    # A sparse solve can run out of time before it has searched away every
+    # non-candidate arc; retry those strategies on the dense model of that part.
+    failed = [key for key in tasks if not routes[key] and task_data[key]["neighbours"]]
+    if failed:
+        with trace.phase("matrix"):
+            dense = {
+                p: routing_data(store, subproblems[p][1], subproblems[p][2], 0)
+                for p in {p for _, p in failed}
+            }
+        for k, p in failed:
+            task_data[k, p] = dense[p]
+        routes.update(zip(failed, solve(failed)))
+
+    variants, variant_routes = [], []
+    for k, strategy in enumerate(strategies):
+        keys = [(k, p) for p in range(len(subproblems))]
+        if not all(routes[key] for key in keys):
+            continue
+
+        with trace.phase("extract"):
+            variant = stitch_variants(
+                [
+                    assign_vehicles_and_extract_routes(
+                        task_data[k, p], routes[k, p], subproblems[p][2], subproblems[p][1], store
+                    )
+                    for k, p in keys
+                ],
+                vehicles,
             )
 
-            try:
-                strategy_enum = routing_enums_pb2.FirstSolutionStrategy
-                variant["strategy"] = strategy_enum.keys()[strategies[i]]  
-            except (IndexError, AttributeError):
-                variant["strategy"] =  ({strategies[i]})
+        variant["strategy"] = strategy_label(strategy)
+        variant["solver"] = {
+            "budget_seconds": round(sum(solver_stats[key]["time_limit"] for key in keys), 4),
+            "search_seconds": round(sum(solver_stats[key]["search_seconds"] for key in keys), 4),
+            "stop_reasons": [solver_stats[key]["stop_reason"] for key in keys],
+        }
+        variants.append(variant)
+        variant_routes.append(
+            [(routes[k, p], subproblems[p][2], subproblems[p][1]) for k, p in keys]
+        )
+
+    if not variants and len(subproblems) > 1:
+        logger.warning("Clustered solve found no complete variant, solving the delivery whole.")
+        return solve_route_variants(
+            store,
+            orders,
+            vehicles,
+            num_variants,
+            neighbours,
+            previous_routes,
+            trace,
+            max(deadline_at - time.monotonic(), 1e-3) if deadline_at is not None else None,
+            decompose=False,
+        )
+    if not variants:
+        raise ValueError("ERROR: No valid route variants generated.")
+
+    return variants, variant_routes
+
+
+def solve_time_budget(n_orders, available=None):
+    """Seconds one strategy may search a problem of n_orders orders.
+
+    The budget grows by ROUTING_TIME_PER_ORDER per order between
+    ROUTING_TIME_LIMIT_MIN and ROUTING_TIME_LIMIT_MAX, and is cut to the
+    available seconds left before a caller's deadline.
+    """
+    budget = settings.ROUTING_TIME_PER_ORDER * n_orders
+    budget = min(max(budget, settings.ROUTING_TIME_LIMIT_MIN), settings.ROUTING_TIME_LIMIT_MAX)
+    if available is not None:
+        budget = max(min(budget, available), settings.ROUTING_TIME_LIMIT_MIN)
+    return budget
+
+
+def strategy_label(strategy):
+    """Name of a first-solution strategy, such as "SAVINGS"; its number if it has none."""
+    try:
+        return routing_enums_pb2.FirstSolutionStrategy.Value.Name(strategy)
+    except ValueError:
+        return f"{strategy}"
+
+
+def warm_start_routes(previous_routes, data, orders, vehicles):
+    """Rebuild stored vehicle routes on the node indices of the current data.
+
+    Stops are matched by order_id and vehicle_no, so cancelled orders drop
+    out and stops that no longer fit a vehicle are freed. Orders without a
+    stop are then inserted, heaviest first, where they lengthen a route
+    least. Orders are placed by their stop, so orders sharing a stop move
+    together. Returns one stop node list per vehicle, or None when a stop
+    cannot be placed or nothing of the old plan carries over.
+    """
+    matrix = data["distance_matrix"]
+    demands = data["demands"]
+    capacities = data["vehicle_capacities"]
+    nodes = {
+        str(order.order_id): data["stop_of"][i] for i, order in enumerate(orders, start=1)
+    }
+    stored = {route["vehicle_no"]: route["route"] for route in previous_routes}
+
+    routes, loads, placed = [], [], set()
+    for vehicle_id, vehicle in enumerate(vehicles):
+        route, load = [], 0
+        for stop in stored.get(vehicle.vehicle_no, []):
+            node = nodes.get(str(stop["location"]))
+            if node is None or node in placed:
+                continue
+            if load + demands[node] > capacities[vehicle_id]:
+                continue
+            route.append(node)
+            placed.add(node)
+            load += demands[node]
+        routes.append(route)
+        loads.append(load)
+    if not placed:
+        return None
+
+    missing = sorted(set(range(1, len(demands))) - placed, key=lambda n: -demands[n])
+    for node in missing:
+        best = None
+        for vehicle_id, route in enumerate(routes):
+            if loads[vehicle_id] + demands[node] > capacities[vehicle_id]:
+                continue
+            path = [0] + route + [0]
+            for position, (a, b) in enumerate(zip(path, path[1:])):
+                cost = matrix[a][node] + matrix[node][b] - matrix[a][b]
+                if best is None or cost < best[0]:
+                    best = (cost, vehicle_id, position)
+        if best is None:
+            return None
+        _, vehicle_id, position = best
+        routes[vehicle_id].insert(position, node)
+        loads[vehicle_id] += demands[node]
+    return routes
+
+
+def partition_instance(store, orders, vehicles):
+    """Cluster-first split of a large delivery into (orders, vehicles) sub-problems.
+
+    Vehicles are shared out into fleets of balanced capacity, one per
+    roughly ROUTING_CLUSTER_SIZE orders, and orders are swept into
+    geographic sectors around the store cut to fit each fleet. The
+    vehicles of an empty sector join the next one. Returns None when a
+    sector still holds more weight, or a heavier order, than its fleet
+    can carry, so the caller solves the delivery whole instead.
+    """
+    n_clusters = min(
+        len(vehicles), -(-len(orders) // settings.ROUTING_CLUSTER_SIZE)
+    )
+    capacities = [v.capacity for v in vehicles]
+    fleets = split_vehicles(capacities, n_clusters)
+    coords = point_coordinates([o.delivery_location.point for o in orders])
+    clusters = sweep_partition(
+        store.location.point.coords,
+        coords,
+        [o.weight for o in orders],
+        [sum(capacities[i] for i in fleet) for fleet in fleets],
+    )
 
-            variants.append(variant)
+    parts, spare = [], []
+    for cluster, fleet in zip(clusters, fleets):
+        spare.extend(fleet)
+        if len(cluster):
+            parts.append((list(cluster), sorted(spare)))
+            spare = []
+    parts[-1][1].extend(spare)
+    parts[-1][1].sort()
+
+    for cluster, fleet in parts:
+        weights = [orders[i].weight for i in cluster]
+        if sum(weights) > sum(capacities[i] for i in fleet) or max(weights) > max(
+            capacities[i] for i in fleet
+        ):
+            return None
+    return [
+        ([orders[i] for i in cluster], [vehicles[i] for i in fleet])
+        for cluster, fleet in parts
+    ]
 
 
+def stitch_variants(parts, vehicles):
+    """Merge per-cluster variants into one variant, keeping the fleet order."""
+    by_vehicle = {
+        route["vehicle_no"]: route for part in parts for route in part["vehicle_routes"]
+    }
+    return {
+        "vehicle_routes": [by_vehicle[v.vehicle_no] for v in vehicles],
+        "total_distance": sum(part["total_distance"] for part in parts),
+    }
 
-    if not variants:
-        raise ValueError("ERROR: No valid route variants generated.")
 
-    return variants
+def save_route_assignments(delivery, parts):
+    """Write the chosen variant's vehicle and delivery onto its orders in one transaction.
 
+    parts holds one (vehicle_routes, vehicles, orders) triple per sub-problem.
+    """
+    assigned = []
+    for vehicle_routes, vehicles, orders in parts:
+        for vehicle, route in zip(vehicles, vehicle_routes):
+            for i in route[1:-1]:
+                order = orders[i - 1]
+                order.vehicle = vehicle
+                order.delivery = delivery
+                assigned.append(order)
 
-def assign_vehicles_and_extract_routes(
-    data, manager, routing, solution, vehicles, orders, delivery, store
-):
-    routes = []
-    total_distance = 0
+    with transaction.atomic():
+        Order.objects.bulk_update(assigned, ["vehicle", "delivery"], batch_size=1000)
 
-    for vehicle_id in range(data["num_vehicles"]):
-        index = routing.Start(vehicle_id)
-        route, route_distance = [], 0
-        vehicle_weight = 0
 
-        while not routing.IsEnd(index):
-            route.append(manager.IndexToNode(index))
-            prev_idx = index
-            index = solution.Value(routing.NextVar(index))
-            route_distance += data["distance_matrix"][manager.IndexToNode(prev_idx)][
-                manager.IndexToNode(index)
-            ]
+def assign_vehicles_and_extract_routes(data, vehicle_routes, vehicles, orders, store):
+    routes = []
+    total_distance = 0
+    matrix, stop_of = data["distance_matrix"], data["stop_of"]
 
-        route.append(manager.IndexToNode(index))
-        assigned_order_ids = [orders[i - 1].id for i in route[1:-1]]
+    for vehicle_id, route in enumerate(vehicle_routes):
+        route_distance = int(
+            sum(matrix[stop_of[a]][stop_of[b]] for a, b in zip(route, route[1:]))
+        )
+        vehicle_weight = sum(orders[i - 1].weight for i in route[1:-1])
 
         mapped_route = [
             (
@@ -160,10 +695,6 @@ def assign_vehicles_and_extract_routes(
             for i in route
         ]
 
-        for order_id in assigned_order_ids:
-            order = Order.objects.get(id=order_id)
-            vehicle_weight += order.weight
-
         vehicle_route_info = {
             "vehicle_no": vehicles[vehicle_id].vehicle_no,
             "average_speed_kmh": vehicles[vehicle_id].average_speed,
@@ -174,13 +705,80 @@ def assign_vehicles_and_extract_routes(
             "route": mapped_route,
         }
 
-        for order_id in assigned_order_ids:
-            order = Order.objects.get(id=order_id)
-            order.vehicle = vehicles[vehicle_id]
-            order.delivery = delivery
-            order.save()
-
         routes.append(vehicle_route_info)
         total_distance += route_distance
 
     return {"vehicle_routes": routes, "total_distance": total_distance / 1000}
+
+
+def delivery_for(store, date_of_delivery):
+    """The store's delivery for a date; vehicles are attached once, when it is created."""
+    delivery, created = Delivery.objects.get_or_create(
+        store=store,
+        date_of_delivery=date_of_delivery,
+        defaults={"total_weight": 0},
+    )
+    if created:
+        delivery.vehicles.set(Vehicle.objects.all())
+    return delivery
+
+
+def count_orders_added(delivery, orders):
+    """Add the weight of orders that joined a delivery with an in-database increment."""
+    Delivery.objects.filter(id=delivery.id).update(
+        total_weight=F("total_weight") + sum(o.weight for o in orders)
+    )
+    record_orders_added(delivery, orders)
+
+
+def add_orders_to_delivery(store, date_of_delivery, orders):
+    """Attach saved orders to the store's delivery for a date in one pass.
+
+    Membership is written with a single update and the weight is added with
+    an in-database increment, so concurrent writers never lose each other's
+    totals.
+    """
+    delivery = delivery_for(store, date_of_delivery)
+    Order.objects.filter(id__in=[o.id for o in orders]).update(delivery=delivery)
+    count_orders_added(delivery, orders)
+    for order in orders:
+        order.delivery = delivery
+
+    return delivery
+
+
+def refresh_delivery_weights(delivery_ids):
+    """Recompute total_weight of deliveries from their orders in one update.
+
+    Used where an increment cannot be derived, such as edited weights or
+    orders that moved to another delivery.
+    """
+    weights = (
+        Order.objects.filter(delivery=OuterRef("pk"))
+        .values("delivery")
+        .annotate(weight=Sum("weight"))
+        .values("weight")
+    )
+    Delivery.objects.filter(id__in=delivery_ids).update(
+        total_weight=Coalesce(Subquery(weights), 0.0)
+    )
+
+
+def rehome_orders(orders):
+    """Move orders whose date_of_order no longer matches their delivery's date.
+
+    Each moved order joins its store's delivery for the new date. Returns
+    the ids of the deliveries the orders were in, moved or not, whose
+    totals the caller should refresh.
+    """
+    deliveries = Delivery.objects.select_related("store").in_bulk(
+        {order.delivery_id for order in orders if order.delivery_id}
+    )
+    moved = {}
+    for order in orders:
+        delivery = deliveries.get(order.delivery_id)
+        if delivery is not None and order.date_of_order != delivery.date_of_delivery:
+            moved.setdefault((delivery.store, order.date_of_order), []).append(order)
+    for (store, date_of_delivery), batch in moved.items():
+        add_orders_to_delivery(store, date_of_delivery, batch)
+    return set(deliveries)
@@ -1,46 +1,72 @@
+import io
 import json
 import logging
-import requests
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
+from django.urls import reverse
 from django.views import View
 from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db import IntegrityError
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework.views import APIView
-from django.contrib.gis.geos import Point
-from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from django.contrib.gis.geos import GEOSGeometry, Point
+from rest_framework import generics, viewsets, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from django.core.management import call_command
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
-from delivery_app.utils import assign_routes_to_delivery
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from delivery_app.jobs import QueueFull, submit_solve_job
+from delivery_app.ingest import import_order_batch, import_orders, iter_rows
+from delivery_app.distance_cache import distance_cache
+from delivery_app.locations import resolve_location
+from delivery_app.metrics import metrics, solve_job_samples
+from delivery_app.plans import (
+    deliveries_to_plan,
+    delivery_fingerprint,
+    load_delivery,
+    planning_queryset,
+    stored_route_plans,
+)
 from delivery_app.signals import create_or_update_delivery
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
-from delivery_app.models import Location, Order, Store, Vehicle, Delivery
+from delivery_app.models import Location, Order, Store, Vehicle, Delivery, RoutePlan, SolveJob
 from delivery_app.serializers import (
     LocationSerializer,
     OrderSerializer,
     StoreSerializer,
     VehicleSerializer,
     DeliverySerializer,
+    SolveJobSerializer,
+    LocationBulkUpdateSerializer,
+    OrderBulkUpdateSerializer,
+    DashboardDeliverySerializer,
+    DashboardOrderSerializer,
+    DashboardStoreSerializer,
+    DashboardVehicleSerializer,
+    DailyDeliveryStatsSerializer,
 )
+from delivery_app.stats import available_dates, refresh_delivery_stats, stats_in_range
+from delivery_app.store_index import store_index
+from delivery_app.utils import refresh_delivery_weights, rehome_orders
+from delivery_app.wire import compact_variant
 
 logger = logging.getLogger(__name__)
 
 
 def home(request):
-    available_dates = Delivery.objects.values("date_of_delivery").distinct()
-    context = {
-        "locations": Location.objects.all(),
-        "orders": Order.objects.all(),
-        "stores": Store.objects.all(),
-        "vehicles": Vehicle.objects.all(),
-        "deliveries": Delivery.objects.all(),
-        "available_dates": [date["date_of_delivery"] for date in available_dates],
-    }
-    return render(request, "home.html", context)
+    return render(request, "home.html")
 
 
 def add_order(request):
@@ -87,10 +113,17 @@ def add_vehicle(request):
 
 
 def assign_vehicles_to_delivery(request):
+    queued = 0
     try:
-        call_command("vehicles_for_delivery")
+        for delivery in deliveries_to_plan():
+            submit_solve_job(delivery)
+            queued += 1
         messages.success(
-            request, "Vehicles have been successfully assigned to the delivery."
+            request, f"Vehicle assignment has been queued for {queued} unplanned or outdated deliveries."
+        )
+    except QueueFull as e:
+        messages.error(
+            request, f"Error: {str(e)} Queued {queued} deliveries; try again shortly for the rest."
         )
     except Exception as e:
         messages.error(request, f"Error: {str(e)}")
@@ -98,7 +131,7 @@ def assign_vehicles_to_delivery(request):
 
 
 @csrf_exempt
-def add_location_and_order(request):
+async def add_location_and_order(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body.decode("utf-8"))
@@ -115,11 +148,11 @@ def add_location_and_order(request):
             latitude = float(latitude)
             longitude = float(longitude)
 
-            location = Location.objects.create(
-                address=address, point=f"POINT({longitude} {latitude})"
+            location = await sync_to_async(resolve_location)(
+                address, Point(longitude, latitude, srid=4326)
             )
 
-            order = Order.objects.create(
+            order = await Order.objects.acreate(
                 order_id=order_id,
                 weight=float(weight),
                 date_of_order=date_of_order,
@@ -136,30 +169,185 @@ def add_location_and_order(request):
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
 
-class LocationViewSet(viewsets.ModelViewSet):
+@csrf_exempt
+def import_orders_file(request):
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if upload is None:
+            return JsonResponse({"error": "Missing file upload"}, status=400)
+
+        fmt = request.GET.get("format") or (
+            "csv" if upload.name.endswith(".csv") else "ndjson"
+        )
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+            report = import_orders(iter_rows(stream, fmt))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+        return JsonResponse(report, status=201 if report["created"] else 400)
+
+    return JsonResponse({"error": "Invalid request method"}, status=405)
+
+
+class IdCursorPagination(CursorPagination):
+    page_size = 25
+    page_size_query_param = "limit"
+    max_page_size = 200
+    ordering = "-id"
+
+
+class NDJSONStreamMixin:
+    """List every row as newline-delimited JSON with ?stream=1.
+
+    Rows are read through a server-side cursor and serialized a chunk at a
+    time, so a full export runs in constant memory.
+    """
+
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("stream") not in ("1", "true"):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by("id")
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+
+        def lines():
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            while chunk := list(islice(rows, self.stream_chunk_size)):
+                data = serializer_class(chunk, many=True, context=context).data
+                yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in data)
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+
+class BulkUpdateMixin:
+    """PATCH a list of {"id": ..., field: value} objects to <list>/bulk/ in one bulk_update."""
+
+    bulk_update_serializer_class = None
+
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_update(self, request, *args, **kwargs):
+        serializer = self.bulk_update_serializer_class(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        rows = serializer.validated_data
+        model = self.get_queryset().model
+        objects = model.objects.in_bulk([row["id"] for row in rows])
+        missing = [row["id"] for row in rows if row["id"] not in objects]
+        if missing:
+            return Response(
+                {"error": f"Unknown ids: {missing}"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        fields = set()
+        for row in rows:
+            obj = objects[row["id"]]
+            for field, value in row.items():
+                if field != "id":
+                    setattr(obj, field, value)
+                    fields.add(field)
+        if fields:
+            with transaction.atomic():
+                model.objects.bulk_update(objects.values(), sorted(fields), batch_size=1000)
+            self.after_bulk_update(list(objects.values()))
+        return Response({"updated": len(objects)}, status=status.HTTP_200_OK)
+
+    def after_bulk_update(self, objects):
+        """Redo what the skipped post_save signals would have done."""
+
+
+def as_point(value):
+    return GEOSGeometry(value) if isinstance(value, str) else value
+
+
+class LocationViewSet(NDJSONStreamMixin, BulkUpdateMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
+    pagination_class = IdCursorPagination
+    bulk_update_serializer_class = LocationBulkUpdateSerializer
 
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        locations = Location.objects.bulk_create(
+            [Location(**row) for row in serializer.validated_data], batch_size=1000
+        )
+        return Response(
+            self.get_serializer(locations, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def after_bulk_update(self, objects):
+        for location in objects:
+            distance_cache.invalidate(location.id)
+        store_index.invalidate()
+
+
+class OrderViewSet(NDJSONStreamMixin, BulkUpdateMixin, viewsets.ModelViewSet):
+    queryset = Order.objects.select_related("delivery_location")
     serializer_class = OrderSerializer
+    pagination_class = IdCursorPagination
+    bulk_update_serializer_class = OrderBulkUpdateSerializer
 
     def create(self, request, *args, **kwargs):
-        location_data = request.data.pop("delivery_location", None)
-        if location_data:
-            location_serializer = LocationSerializer(data=location_data)
-            if location_serializer.is_valid():
-                location = location_serializer.save()
-                request.data["delivery_location"] = location.id
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+        # OrderSerializer.create resolves the location once the order is valid.
         return super().create(request, *args, **kwargs)
 
+    def bulk_create(self, request):
+        """Create a list of orders with their locations through the bulk import path."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if not store_index.stores():
+            return Response(
+                {"error": "No store is defined in the system."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        batch = [
+            (
+                line,
+                {
+                    "order_id": str(row["order_id"]),
+                    "weight": row["weight"],
+                    "date_of_order": row["date_of_order"],
+                    "address": row["delivery_location"]["address"],
+                    "point": as_point(row["delivery_location"]["point"]),
+                },
+            )
+            for line, row in enumerate(serializer.validated_data, start=1)
+        ]
+        report = {"created": 0, "errors": []}
+        report["created"] = import_order_batch(batch, report["errors"])
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST,
+        )
+
+    def after_bulk_update(self, objects):
+        previous = rehome_orders(objects)
+        refresh_delivery_weights(previous)
+        for delivery_id in previous:
+            refresh_delivery_stats(delivery_id)
 
-class StoreViewSet(viewsets.ModelViewSet):
-    queryset = Store.objects.all()
+
+class StoreViewSet(NDJSONStreamMixin, viewsets.ModelViewSet):
+    queryset = Store.objects.select_related("location")
     serializer_class = StoreSerializer
+    pagination_class = IdCursorPagination
 
     def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+
         location_data = request.data.pop("location", None)
         if location_data:
             location_serializer = LocationSerializer(data=location_data)
@@ -168,124 +356,164 @@ class StoreViewSet(viewsets.ModelViewSet):
                 request.data["location"] = location.id
         return super().create(request, *args, **kwargs)
 
+    def bulk_create(self, request):
+        """Create a list of stores, inserting all their locations in one statement."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+        with transaction.atomic():
+            locations = Location.objects.bulk_create(
+                [Location(**row["location"]) for row in rows]
+            )
+            stores = Store.objects.bulk_create(
+                [
+                    Store(name=row["name"], location=location)
+                    for row, location in zip(rows, locations)
+                ]
+            )
+        store_index.invalidate()
+        return Response(
+            self.get_serializer(stores, many=True).data, status=status.HTTP_201_CREATED
+        )
+
 
 class VehicleViewSet(viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
 
 
-class DeliveryDetailAPIView(APIView):
-    def get(self, request, *args, **kwargs):
-        try:
-            delivery_id = kwargs.get("pk")
-            delivery = Delivery.objects.prefetch_related("orders", "vehicles").get(
-                id=delivery_id
-            )
+def parse_deadline(value):
+    """Seconds a caller allows for a solve, or None when not given."""
+    if value in (None, ""):
+        return None
+    deadline = float(value)
+    if not deadline > 0:
+        raise ValueError("deadline must be a positive number of seconds")
+    return deadline
 
-            store = delivery.store
-            orders = list(delivery.orders.all())
-            vehicles = list(delivery.vehicles.all())
 
-            logging.debug(f"Store: {store}, Orders: {orders}, Vehicles: {vehicles}")
+def solve_job_reply(delivery, resolve=False, deadline=None):
+    """Queue a solve for a delivery, returning the (data, status, headers) of the reply.
 
-            solution = assign_routes_to_delivery(
-                store, orders, vehicles, delivery.date_of_delivery
-            )
-            return Response(solution, status=status.HTTP_200_OK)
+    The reply is 202 with the queued job, or 429 when the queue is full.
+    """
+    try:
+        job = submit_solve_job(delivery, resolve=resolve, deadline=deadline)
+    except QueueFull as e:
+        return (
+            {"error": str(e)},
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            {"Retry-After": str(settings.SOLVE_RETRY_AFTER)},
+        )
+    return (
+        SolveJobSerializer(job).data,
+        status.HTTP_202_ACCEPTED,
+        {"Location": reverse("solve-job", args=[job.id])},
+    )
+
+
+def solve_job_response(delivery, resolve=False, deadline=None):
+    data, code, headers = solve_job_reply(delivery, resolve, deadline)
+    return Response(data, status=code, headers=headers)
+
+
+class DeliveryDetailAPIView(APIView):
+    def get(self, request, *args, **kwargs):
+        try:
+            delivery = load_delivery(kwargs.get("pk"))
         except Delivery.DoesNotExist:
             return Response(
                 {"error": "Delivery not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        resolve = request.query_params.get("resolve") in ("1", "true")
+        logging.debug(f"Delivery: {delivery}, resolve: {resolve}")
+        try:
+            deadline = parse_deadline(request.query_params.get("deadline"))
+        except ValueError:
+            return Response(
+                {"error": "Invalid deadline"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-def optimization_visualizations(request, delivery_id):
-    delivery = get_object_or_404(Delivery, id=delivery_id)
-    api_url = f"{settings.SITE_URL}/delivery/{delivery_id}/"
+        if not resolve:
+            solution = stored_route_plans(delivery)
+            if solution:
+                return Response(solution, status=status.HTTP_200_OK)
+        return solve_job_response(delivery, resolve=resolve, deadline=deadline)
 
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        optimization_data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch optimization data: {e}")
-        return render(
-            request, "error.html", {"message": "Unable to fetch optimization data."}
-        )
 
-    solution1_routes = optimization_data[0].get("vehicle_routes", [])
-    solution2_routes = optimization_data[1].get("vehicle_routes", [])
-    solution3_routes = optimization_data[2].get("vehicle_routes", [])
+class DeliverySolveAPIView(APIView):
+    def post(self, request, *args, **kwargs):
+        delivery = get_object_or_404(Delivery, id=kwargs.get("pk"))
+        resolve = str(request.data.get("resolve", "")).lower() in ("1", "true")
+        try:
+            deadline = parse_deadline(request.data.get("deadline"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Invalid deadline"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return solve_job_response(delivery, resolve=resolve, deadline=deadline)
 
-    def process_routes(routes):
-        processed_routes = []
-        for route in routes:
-            try:
-                vehicle_no = route.get("vehicle_no", "Unknown Vehicle")
-                route_distance_km = route.get("route_distance_km", float("inf"))
-                assigned_order_weight = route.get("assigned_order_weight", 0)
-                average_speed_kmh = route.get("average_speed_kmh", 0)
-                remaining_capacity = route.get("remaining_capacity", 0)
-                capacity = route.get("capacity", 0)
-                coordinates = [
-                    [coord["coordinates"][0], coord["coordinates"][1]]
-                    for coord in route.get("route", [])
-                    if coord.get("coordinates")
-                ]
 
-                processed_routes.append(
-                    {
-                        "vehicle_no": vehicle_no,
-                        "route_distance_km": route_distance_km,
-                        "assigned_order_weight": assigned_order_weight,
-                        "average_speed_kmh": average_speed_kmh,
-                        "remaining_capacity": remaining_capacity,
-                        "capacity": capacity,
-                        "coordinates": coordinates,
-                    }
-                )
-
-            except Exception as e:
-                logger.warning(f"Error processing route data: {route}. Error: {e}")
-        return processed_routes
-
-    solution1 = process_routes(solution1_routes)
-    solution2 = process_routes(solution2_routes)
-    solution3 = process_routes(solution3_routes)
-
-    def total_distance(routes):
-        return sum(route["route_distance_km"] for route in routes)
-
-    total_distance_solution1 = total_distance(solution1)
-    total_distance_solution2 = total_distance(solution2)
-    total_distance_solution3 = total_distance(solution3)
-
-    best_solution = min(
-        [
-            (solution1, total_distance_solution1),
-            (solution2, total_distance_solution2),
-            (solution3, total_distance_solution3),
-        ],
-        key=lambda x: x[1],
-    )[0]
-
-    context = {
-        "delivery": delivery,
-        "solution1": json.dumps(solution1),
-        "solution2": json.dumps(solution2),
-        "solution3": json.dumps(solution3),
-        "best_solution": json.dumps(best_solution),
-    }
+class SolveJobAPIView(APIView):
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(SolveJob, id=kwargs.get("pk"))
+        data = SolveJobSerializer(job).data
+        if job.status == SolveJob.DONE:
+            data["result"] = [
+                plan.as_variant() for plan in job.delivery.route_plans.all()
+            ]
+        return Response(data, status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    cutoff = timezone.now() - timedelta(seconds=settings.METRICS_SOLVE_WINDOW)
+    jobs = SolveJob.objects.filter(
+        Q(status__in=SolveJob.ACTIVE_STATUSES) | Q(finished_at__gte=cutoff)
+    ).values_list("status", "stats")
+    return HttpResponse(
+        metrics.render(solve_job_samples(jobs)),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@require_GET
+async def delivery_route_plans(request, pk):
+    """Compact route variants of a delivery, revalidated by ETag.
+
+    The ETag is the fingerprint of the delivery's current solver inputs
+    plus the id of its latest stored plan, so a client holding the current
+    variants gets a 304 without any plan being loaded or encoded. Without
+    current plans a solve is queued from a worker thread and 202 returned.
+    """
+    delivery = await planning_queryset().filter(id=pk).afirst()
+    if delivery is None:
+        return JsonResponse({"error": "Delivery not found"}, status=404)
+    fingerprint = delivery_fingerprint(delivery)
+    plans = RoutePlan.objects.filter(delivery=delivery, fingerprint=fingerprint)
+    latest = (await plans.aaggregate(latest=Max("id")))["latest"]
+    if latest is None:
+        data, code, headers = await sync_to_async(solve_job_reply)(delivery)
+        return JsonResponse(data, status=code, headers=headers)
+
+    etag = quote_etag(f"{fingerprint[:32]}-{latest}")
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    variants = [compact_variant(plan.as_variant()) async for plan in plans]
+    return JsonResponse(
+        {"delivery": delivery.id, "variants": variants},
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
 
-    print("solution 1:", solution1)
-    print("solution 2:", solution2)
-    print("solution 3:", solution3)
-    print("best solution:", best_solution)
 
-    return render(request, "visualization.html", context)
+def optimization_visualizations(request, delivery_id):
+    delivery = get_object_or_404(Delivery, id=delivery_id)
+    return render(request, "visualization.html", {"delivery": delivery})
 
 
 class DeliveryListByDateView(View):
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         delivery_date = request.GET.get("delivery_date")
 
         try:
@@ -293,9 +521,12 @@ class DeliveryListByDateView(View):
         except ValueError:
             return render(request, "error.html", {"message": "Invalid date format."})
 
-        deliveries = Delivery.objects.filter(
-            date_of_delivery=delivery_date
-        ).prefetch_related("orders", "vehicles")
+        deliveries = [
+            delivery
+            async for delivery in Delivery.objects.filter(
+                date_of_delivery=delivery_date
+            ).prefetch_related("orders", "vehicles")
+        ]
 
         if not deliveries:
             return render(
@@ -337,3 +568,115 @@ def add_vehicle_data(request):
             return JsonResponse({"error": "Vehicle number must be unique."}, status=400)
 
     return JsonResponse({"error": "Invalid request method."}, status=405)
+
+
+def dashboard_filters(request):
+    """Parse the ?date, ?start, ?end (YYYY-MM-DD) and ?store=<id> filters of a dashboard request."""
+    filters = {}
+    for name in ("date", "start", "end"):
+        if request.GET.get(name):
+            try:
+                filters[name] = datetime.strptime(request.GET[name], "%Y-%m-%d").date()
+            except ValueError:
+                raise ValidationError({name: "Expected YYYY-MM-DD."})
+    if request.GET.get("store"):
+        try:
+            filters["store"] = int(request.GET["store"])
+        except ValueError:
+            raise ValidationError({"store": "Expected a store id."})
+    return filters
+
+
+class DashboardDeliveryList(generics.ListAPIView):
+    serializer_class = DashboardDeliverySerializer
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        filters = dashboard_filters(self.request)
+        queryset = Delivery.objects.select_related("store")
+        if "date" in filters:
+            queryset = queryset.filter(date_of_delivery=filters["date"])
+        if "store" in filters:
+            queryset = queryset.filter(store_id=filters["store"])
+        return queryset
+
+
+class DashboardOrderList(generics.ListAPIView):
+    serializer_class = DashboardOrderSerializer
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        filters = dashboard_filters(self.request)
+        queryset = Order.objects.select_related("delivery_location")
+        if "date" in filters:
+            queryset = queryset.filter(date_of_order=filters["date"])
+        if "store" in filters:
+            queryset = queryset.filter(delivery__store_id=filters["store"])
+        return queryset
+
+
+class DashboardStoreList(generics.ListAPIView):
+    queryset = Store.objects.select_related("location")
+    serializer_class = DashboardStoreSerializer
+    pagination_class = IdCursorPagination
+
+
+class DashboardVehicleList(generics.ListAPIView):
+    queryset = Vehicle.objects.all()
+    serializer_class = DashboardVehicleSerializer
+    pagination_class = IdCursorPagination
+
+
+@require_GET
+async def dashboard_summary_view(request):
+    try:
+        filters = dashboard_filters(request)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    key = f"dashboard-summary:{filters.get('date')}:{filters.get('store')}"
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = await dashboard_summary(filters.get("date"), filters.get("store"))
+        await cache.aset(key, summary, settings.DASHBOARD_SUMMARY_TTL)
+    return JsonResponse(summary)
+
+
+async def dashboard_summary(date=None, store=None):
+    """Counts and totals shown above the dashboard panels, read from the daily stats."""
+    totals = await stats_in_range(date, date, store).aaggregate(
+        deliveries=Count("id"),
+        delivery_weight=Sum("total_weight"),
+        orders=Sum("order_count"),
+    )
+    return {
+        "deliveries": totals["deliveries"],
+        "delivery_weight": totals["delivery_weight"] or 0,
+        "orders": totals["orders"] or 0,
+        "stores": await Store.objects.acount(),
+        "vehicles": await Vehicle.objects.acount(),
+    }
+
+
+class DailyStatsPagination(IdCursorPagination):
+    ordering = ("-date", "-id")
+
+
+class DailyStatsList(generics.ListAPIView):
+    serializer_class = DailyDeliveryStatsSerializer
+    pagination_class = DailyStatsPagination
+
+    def get_queryset(self):
+        filters = dashboard_filters(self.request)
+        if "date" in filters:
+            filters["start"] = filters["end"] = filters["date"]
+        return stats_in_range(filters.get("start"), filters.get("end"), filters.get("store"))
+
+
+@require_GET
+async def available_dates_view(request):
+    try:
+        filters = dashboard_filters(request)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    dates = available_dates(filters.get("start"), filters.get("end"), filters.get("store"))
+    return JsonResponse({"dates": [d async for d in dates]})
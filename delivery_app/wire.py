@@ -0,0 +1,46 @@
+def encode_polyline(points, precision=5):
+    """Encode [lat, lon] pairs with Google's encoded polyline algorithm."""
+    factor = 10**precision
+    chunks = []
+    previous = (0, 0)
+    for lat, lon in points:
+        current = (round(lat * factor), round(lon * factor))
+        for delta in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous = current
+    return "".join(chunks)
+
+
+def compact_route(route):
+    """One used vehicle route as a polyline through its stops plus their order ids."""
+    return {
+        "vehicle_no": route["vehicle_no"],
+        "capacity": route["capacity"],
+        "average_speed_kmh": route["average_speed_kmh"],
+        "load": route["assigned_order_weight"],
+        "distance_km": route["route_distance_km"],
+        "orders": [stop["location"] for stop in route["route"][1:-1]],
+        "polyline": encode_polyline(stop["coordinates"] for stop in route["route"]),
+    }
+
+
+def compact_variant(variant):
+    """Drop idle vehicles and replace per-stop dicts with a polyline and an order id array.
+
+    The depot is the first and last point of every polyline, so it is not
+    labelled; stops keep the order of the orders array.
+    """
+    return {
+        "strategy": variant["strategy"],
+        "total_distance": variant["total_distance"],
+        "solver": variant.get("solver", {}),
+        "vehicles": [
+            compact_route(route)
+            for route in variant["vehicle_routes"]
+            if len(route["route"]) > 2
+        ],
+    }